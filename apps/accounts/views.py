@@ -74,7 +74,7 @@ def student_dashboard(request):
     Student dashboard view
     Shows overview of student's hostel status, applications, etc.
     """
-    from apps.hostel.models import RoomAssignment, Payment, Semester
+    from apps.hostel.models import HostelApplication, RoomAssignment, Payment, Semester
     
     # Find the latest room assignment linked to an approved application
     latest_assignment = RoomAssignment.objects.filter(
@@ -110,14 +110,14 @@ def student_dashboard(request):
     
     # Check if the student has any pending/approved applications
     has_active_application = request.user.hostel_applications.filter(
-        status__in=['pending', 'approved']
+        status__in=HostelApplication.ACTIVE_STATUSES
     ).exists()
     
     has_other_active_application = False
     if latest_application and latest_application.status == 'rejected':
         # Check if the student has any other pending or approved applications
         has_other_active_application = request.user.hostel_applications.filter(
-            status__in=['pending', 'approved']
+            status__in=HostelApplication.ACTIVE_STATUSES
         ).exclude(id=latest_application.id).exists()
     
     # A student can apply again if:
@@ -0,0 +1,272 @@
+from collections import Counter
+from functools import partial
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from .availability import free_capacity_by_room_type, free_capacity_for_periods, invalidate_semester_availability
+from .models import HostelApplication, Semester, SemesterQuotaUsage
+from .reports import invalidate_room_statistics
+from .waitlist import leave_waitlist, promote_from_waitlist
+
+# First-come-first-serve admission of new hostel applications.
+# When applications open, lots of students submit at the same second, so the
+# quota check and the save have to happen as one step. We lock the quota
+# counter row for the semester and room type while we check and save; other
+# submissions for the same semester and room type (even from other server
+# processes) wait for the lock, then see the updated counters.
+
+
+def admit_application(application):
+    """
+    Save a new (or queued) application, keeping it pending if there is still
+    quota and a free room for it, otherwise auto-rejecting it.
+    Pending applications hold a place in the quota until staff review them.
+    The student's older applications leave the waitlist in the same
+    transaction, so a promotion can't give them a second live application.
+    Returns True if the application was admitted (pending).
+    """
+    semester = application.semester
+    room_type = application.room_type
+    application.set_dates_from_semester()
+
+    # Make sure the counters exist before we try to lock them
+    SemesterQuotaUsage.get_for_semester(semester)
+
+    with transaction.atomic():
+        usage = SemesterQuotaUsage.objects.select_for_update().get(semester=semester, room_type=room_type)
+        # After the counter lock, in the same order as promote_from_waitlist
+        # takes its locks; a promotion waiting on these rows skips them
+        leave_waitlist(application)
+
+        has_quota = usage.approved + usage.pending < semester.get_quota(room_type)
+        has_room = has_quota and free_capacity_by_room_type(application.start_date, application.end_date)[room_type] > 0
+
+        if has_room:
+            application.status = 'pending'
+        else:
+            application.status = 'rejected'
+            application.rejection_reason = f'Auto-rejected: No quota or rooms available for {room_type} rooms.'
+            application.is_auto_rejected = True
+        # Saving also bumps the counter we are holding the lock on
+        application.save()
+
+    return application.status == 'pending'
+
+
+# Queued intake (HOSTEL_QUEUED_INTAKE setting)
+# The apply page only stores the application as 'queued' and returns right
+# away; the process_application_queue command then admits or rejects queued
+# applications strictly in the order they were submitted.
+
+
+def queue_application(application):
+    """
+    Store a new application as queued without checking quota or rooms,
+    taking the student's older applications off the waitlist with it
+    """
+    application.status = 'queued'
+    with transaction.atomic():
+        leave_waitlist(application)
+        application.save()
+
+
+def process_queued_applications(batch_size=100):
+    """
+    Admit or reject the next batch of queued applications, oldest first.
+    The batch rows stay locked until the whole batch is done, so a second
+    worker waits instead of processing newer applications out of order.
+    Returns (admitted, rejected) counts.
+    """
+    admitted = rejected = 0
+    with transaction.atomic():
+        batch = HostelApplication.objects.select_for_update().filter(
+            status='queued'
+        ).select_related('semester').order_by('date_applied', 'id')[:batch_size]
+        admitted_semesters = set()
+        for application in batch:
+            if admit_application(application):
+                admitted += 1
+                admitted_semesters.add(application.semester_id)
+            else:
+                rejected += 1
+        # Admitted applications hold a place in the quota
+        if admitted_semesters:
+            transaction.on_commit(partial(invalidate_semester_availability, sorted(admitted_semesters)))
+    return admitted, rejected
+
+
+# Auto-rejection reconciler
+# Pending applications that can no longer be approved (quota used up, or no
+# room of their type free for their period) are rejected here, in one place,
+# instead of by the pages that list applications. It is called after changes
+# that affect quota (approvals, quota edits) and by the
+# reconcile_auto_rejections command, which can run on a schedule.
+
+
+def reconcile_auto_rejections(semesters=None):
+    """
+    Auto-reject pending applications that can no longer be approved.
+    Checks the given semesters, or every semester with pending applications.
+    Safe to run any number of times. Returns the number of applications rejected.
+    """
+    if semesters is None:
+        semesters = Semester.objects.filter(
+            id__in=HostelApplication.objects.filter(status='pending').values('semester')
+        )
+
+    rejected = 0
+    for semester in semesters:
+        approved_counts = semester.get_approved_counts()
+        for room_type, _ in HostelApplication.ROOM_TYPE_CHOICES:
+            if semester.get_remaining_quota(room_type, approved_counts) <= 0:
+                rejected += HostelApplication.auto_reject_pending(semester, room_type)
+
+        # Pending applications left over still need a free room for their period
+        periods = HostelApplication.objects.filter(semester=semester, status='pending').order_by().values_list(
+            'room_type', 'start_date', 'end_date'
+        ).distinct()
+        for room_type, start_date, end_date in periods:
+            if free_capacity_by_room_type(start_date, end_date)[room_type] <= 0:
+                rejected += HostelApplication.auto_reject_pending(
+                    semester, room_type,
+                    reason=f'Auto-rejected: No quota or rooms available for {room_type} rooms.',
+                    start_date=start_date, end_date=end_date
+                )
+    return rejected
+
+
+# Bulk decisions
+# Staff can approve or reject many pending applications at once from the
+# all_applications page. The quota counters of every semester and room type
+# involved are locked together, what each of them can still take is worked
+# out once from the remaining quota and the free beds, and then one UPDATE
+# approves the admitted applications and one auto-rejects the others.
+# Bulk UPDATEs send no signals, so the counters and caches are kept up to
+# date here.
+
+
+def _lock_quota_usage(keys):
+    """Lock the counters for these (semester_id, room_type) keys, creating missing ones first"""
+    semester_ids = {semester_id for semester_id, _ in keys}
+    usage = {
+        (u.semester_id, u.room_type): u
+        for u in SemesterQuotaUsage.objects.select_for_update().filter(semester_id__in=semester_ids)
+    }
+    missing = set(keys) - set(usage)
+    if missing:
+        for semester_id in {semester_id for semester_id, _ in missing}:
+            SemesterQuotaUsage.create_missing(
+                semester_id, [room_type for key_semester, room_type in missing if key_semester == semester_id]
+            )
+        usage = {
+            (u.semester_id, u.room_type): u
+            for u in SemesterQuotaUsage.objects.select_for_update().filter(semester_id__in=semester_ids)
+        }
+    return usage
+
+
+def bulk_approve_applications(applications, per_group=None):
+    """
+    Approve the pending applications in `applications`, oldest first within
+    each semester and room type (only the oldest `per_group` of each when
+    given), as far as the remaining quota and the free beds of their period
+    allow. The others that were considered are auto-rejected.
+    The number of queries doesn't depend on the number of applications.
+    Returns (approved, rejected) counts.
+    """
+    with transaction.atomic():
+        rows = list(
+            applications.filter(status='pending').select_for_update(of=('self',)).order_by(
+                'date_applied', 'id'
+            ).values_list('id', 'semester_id', 'room_type', 'start_date', 'end_date')
+        )
+        if not rows:
+            return 0, 0
+
+        usage = _lock_quota_usage({(semester_id, room_type) for _, semester_id, room_type, _, _ in rows})
+        semesters = Semester.objects.in_bulk({semester_id for semester_id, _ in usage})
+        remaining_quota = {
+            key: max(0, semesters[key[0]].get_quota(key[1]) - u.approved) for key, u in usage.items()
+        }
+        # Each approval takes one of the beds free for its period. Periods are
+        # normally the semester's, so applications with different periods
+        # are not checked against each other here; the reconciler below
+        # catches what is left over.
+        free_beds = free_capacity_for_periods((start_date, end_date) for _, _, _, start_date, end_date in rows)
+
+        considered = Counter()
+        approved_ids, rejected_ids = [], []
+        approved, rejected = Counter(), Counter()
+        for application_id, semester_id, room_type, start_date, end_date in rows:
+            key = (semester_id, room_type)
+            if per_group is not None and considered[key] >= per_group:
+                continue
+            considered[key] += 1
+            beds = free_beds[(start_date, end_date)]
+            if remaining_quota[key] > 0 and beds[room_type] > 0:
+                remaining_quota[key] -= 1
+                beds[room_type] -= 1
+                approved_ids.append(application_id)
+                approved[key] += 1
+            else:
+                rejected_ids.append(application_id)
+                rejected[key] += 1
+
+        if approved_ids:
+            HostelApplication.objects.filter(id__in=approved_ids).update(
+                status='approved', is_auto_rejected=False, rejection_reason='', waitlisted=False
+            )
+        if rejected_ids:
+            HostelApplication.objects.filter(id__in=rejected_ids).update(
+                status='rejected', is_auto_rejected=True, waitlisted=True,
+                rejection_reason=Concat(
+                    Value('Auto-rejected: No quota or rooms available for '), F('room_type'), Value(' rooms.')
+                ),
+            )
+        for key in considered:
+            SemesterQuotaUsage.objects.filter(pk=usage[key].pk).update(
+                approved=F('approved') + approved[key], pending=F('pending') - considered[key]
+            )
+
+        transaction.on_commit(invalidate_room_statistics)
+        # Approved and rejected applications both leave pending
+        transaction.on_commit(partial(
+            invalidate_semester_availability, sorted({semester_id for semester_id, _ in considered})
+        ))
+
+    if approved_ids:
+        # Like a single approval, this can leave other pending applications
+        # without quota or a room
+        reconcile_auto_rejections([semesters[semester_id] for semester_id in sorted({s for s, _ in approved})])
+    return len(approved_ids), len(rejected_ids)
+
+
+def bulk_reject_applications(applications, reason='Rejected by staff'):
+    """
+    Reject the pending applications in `applications` with one UPDATE, and
+    give the quota places they held to the first ones on the waitlist.
+    Returns the number of applications rejected.
+    """
+    with transaction.atomic():
+        rows = list(
+            applications.filter(status='pending').select_for_update(of=('self',)).values_list(
+                'id', 'semester_id', 'room_type'
+            )
+        )
+        if not rows:
+            return 0
+        HostelApplication.objects.filter(id__in=[application_id for application_id, _, _ in rows]).update(
+            status='rejected', is_auto_rejected=False, rejection_reason=reason, waitlisted=False
+        )
+        groups = Counter((s, r) for _, s, r in rows)
+        for (semester_id, room_type), count in groups.items():
+            SemesterQuotaUsage.add(semester_id, room_type, 'pending', -count)
+        transaction.on_commit(invalidate_room_statistics)
+        transaction.on_commit(partial(
+            invalidate_semester_availability, sorted({semester_id for semester_id, _ in groups})
+        ))
+
+        semesters = Semester.objects.in_bulk({semester_id for semester_id, _ in groups})
+        for semester_id, room_type in sorted(groups):
+            promote_from_waitlist(semesters[semester_id], room_type)
+    return len(rows)
@@ -0,0 +1,113 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from .availability import invalidate_semester_availability, rooms_with_free_space
+from .models import HostelApplication, Payment, Room, RoomAssignment, RoomOccupancyDay, Semester
+from .reports import invalidate_room_statistics
+
+# Batch room allocation: give every approved application of a semester that
+# has no room yet a room in one go, instead of staff using "Assign Room" one
+# application at a time. Rows are written with bulk_create, and room statuses
+# are recomputed once at the end.
+
+
+def allocate_rooms(semester, dry_run=False):
+    """
+    Assign rooms to all approved, unassigned applications of a semester
+    (oldest application first). Partly filled rooms are used before empty
+    ones, so double rooms are packed to capacity.
+    With dry_run=True nothing is saved, but the counts are still worked out.
+    Returns {'assigned': {...}, 'unassigned': {...}} with counts per room type.
+    """
+    room_types = [room_type for room_type, _ in Room.ROOM_TYPE_CHOICES]
+    result = {
+        'assigned': {room_type: 0 for room_type in room_types},
+        'unassigned': {room_type: 0 for room_type in room_types},
+    }
+
+    with transaction.atomic():
+        # Lock the semester so two allocations for it can't run at the same time
+        Semester.objects.select_for_update().get(pk=semester.pk)
+
+        # Students who already live in a room during the stay are skipped
+        # (same rule as the assign_room view)
+        already_housed = RoomAssignment.objects.filter(
+            student=OuterRef('student'),
+            status='active',
+            start_date__lte=OuterRef('end_date'),
+            end_date__gte=OuterRef('start_date')
+        )
+        applications = HostelApplication.objects.filter(
+            semester=semester,
+            status='approved',
+            room_assignment__isnull=True
+        ).filter(~Exists(already_housed)).select_related('student').order_by('date_applied', 'id')
+
+        # Applications with the same room type and dates compete for the same rooms
+        groups = {}
+        for application in applications:
+            key = (application.room_type, application.start_date, application.end_date)
+            groups.setdefault(key, []).append(application)
+
+        affected_room_ids = set()
+        for (room_type, start_date, end_date), waiting in groups.items():
+            assignments = _fill_rooms(waiting, room_type, start_date, end_date)
+            _save_assignments(assignments, semester)
+            affected_room_ids.update(assignment.room_id for assignment in assignments)
+            result['assigned'][room_type] += len(assignments)
+            result['unassigned'][room_type] += len(waiting) - len(assignments)
+
+        # Recompute the affected rooms' statuses in one go
+        Room.update_statuses(Room.objects.filter(id__in=affected_room_ids))
+
+        if dry_run:
+            transaction.set_rollback(True)
+        elif affected_room_ids:
+            # bulk_create doesn't send post_save. Wait for the commit so the
+            # caches aren't rebuilt from the rows as they were before it.
+            transaction.on_commit(invalidate_room_statistics)
+            transaction.on_commit(invalidate_semester_availability)
+
+    return result
+
+
+def _fill_rooms(applications, room_type, start_date, end_date):
+    """Build (unsaved) assignments, filling the fullest rooms first"""
+    rooms = rooms_with_free_space(start_date, end_date, room_type).order_by('-occupied', 'room_number')
+    waiting = iter(applications)
+    assignments = []
+    for room in rooms:
+        for _ in range(room.free_beds):
+            application = next(waiting, None)
+            if application is None:
+                return assignments
+            assignments.append(RoomAssignment(
+                student=application.student,
+                room=room,
+                hostel_application=application,
+                start_date=start_date,
+                end_date=end_date,
+                status='active',
+                payment_status='pending',
+            ))
+    return assignments
+
+
+def _save_assignments(assignments, semester):
+    """Bulk-create the assignments, their payments and their occupancy index days"""
+    RoomAssignment.objects.bulk_create(assignments, batch_size=1000)
+    for assignment in assignments:
+        assignment._indexed_stay = assignment.occupancy_stay()
+
+    Payment.objects.bulk_create([
+        Payment(
+            student=assignment.student,
+            room_assignment=assignment,
+            amount=assignment.calculate_payment_amount(semester),
+            payment_period_start=assignment.start_date,
+            payment_period_end=assignment.end_date,
+            payment_method='cash',  # Only support cash payments at counter
+            status='pending'
+        ) for assignment in assignments
+    ], batch_size=1000)
+
+    RoomOccupancyDay.add_stays([assignment.occupancy_stay() for assignment in assignments])
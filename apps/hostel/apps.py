@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class HostelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.hostel'
+
+    def ready(self):
+        """
+        Import signal handlers when the app is ready
+        This keeps the occupancy index and quota counters in sync on deletes
+        """
+        import apps.hostel.signals  # noqa
@@ -0,0 +1,261 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from .models import Room, RoomAssignment, RoomOccupancyDay, SemesterQuotaUsage
+
+# Helpers for answering "how many free spots are there for this period?"
+# Everything here is worked out by the database, so the number of queries
+# stays the same no matter how many rooms the hostel has. Free spots are
+# read from the booked nights of the occupancy index (RoomOccupancyDay)
+# rather than by matching up the assignments of every room.
+
+
+def free_beds_expression(occupied):
+    """Capacity of the outer room minus `occupied`, never below zero"""
+    return Greatest(F('capacity') - occupied, Value(0))
+
+
+def rooms_with_free_beds(today):
+    """
+    All rooms annotated with `free_beds`: beds not taken by an active stay
+    that is current or still to come on `today`
+    """
+    booked = RoomAssignment.objects.filter(
+        room=OuterRef('pk'), status='active', end_date__gte=today
+    ).order_by().values('room').annotate(total=Count('id')).values('total')
+    return Room.objects.annotate(free_beds=free_beds_expression(Coalesce(Subquery(booked), Value(0))))
+
+
+def overlapping_occupancy_expression(start_date, end_date):
+    """
+    Number of active assignments of the outer room that overlap the period,
+    counted from the assignments table. Uses the same overlap rule as the
+    booked nights of the occupancy index; the lookups below read the index.
+    """
+    overlapping = RoomAssignment.objects.filter(
+        room=OuterRef('pk'),
+        status='active',
+        start_date__lt=end_date,
+        end_date__gt=start_date
+    ).order_by().values('room').annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(overlapping, output_field=IntegerField()), Value(0))
+
+
+def booked_beds_expression(start_date, end_date):
+    """
+    Most beds of the outer room booked on any night of the period, read from
+    the occupancy index (RoomOccupancyDay). The nights are start_date up to
+    the day before end_date, so stays ending on start_date or starting on
+    end_date don't count, as in overlapping_occupancy_expression().
+    """
+    busiest_night = RoomOccupancyDay.objects.filter(
+        room=OuterRef('pk'),
+        date__gte=start_date,
+        date__lt=end_date,
+    ).order_by().values('room').annotate(peak=Max('booked')).values('peak')
+    return Coalesce(Subquery(busiest_night, output_field=IntegerField()), Value(0))
+
+
+def rooms_with_occupancy(start_date, end_date, room_type=None):
+    """
+    Available rooms annotated with `occupied` (beds booked on the busiest
+    night of the period) and `free_beds`
+    """
+    rooms = Room.objects.filter(status='available')
+    if room_type:
+        rooms = rooms.filter(room_type=room_type)
+    occupied = booked_beds_expression(start_date, end_date)
+    return rooms.annotate(occupied=occupied, free_beds=free_beds_expression(occupied))
+
+
+def rooms_with_free_space(start_date, end_date, room_type=None):
+    """Available rooms that still have at least one free spot for the period"""
+    return rooms_with_occupancy(start_date, end_date, room_type).filter(
+        occupied__lt=F('capacity')
+    )
+
+
+def overbooked_rooms(start_date, end_date):
+    """
+    Rooms (whatever their status) with more beds booked on a night of the
+    period than they have, annotated with `occupied`
+    """
+    return Room.objects.annotate(
+        occupied=booked_beds_expression(start_date, end_date)
+    ).filter(occupied__gt=F('capacity'))
+
+
+def free_capacity_by_room_type(start_date, end_date):
+    """
+    Count the free spots per room type for the period in a single query.
+    Returns a dict like {'single': 3, 'double': 10}
+    """
+    return _sum_free_spots(booked_beds_expression(start_date, end_date))
+
+
+def _sum_free_spots(occupied):
+    """Sum capacity minus `occupied` over available rooms, grouped by room type"""
+    rows = Room.objects.filter(status='available').order_by().values('room_type').annotate(
+        free=Sum(free_beds_expression(occupied))
+    )
+
+    free_capacity = {room_type: 0 for room_type, _ in Room.ROOM_TYPE_CHOICES}
+    for row in rows:
+        free_capacity[row['room_type']] = row['free'] or 0
+    return free_capacity
+
+
+def free_capacity_for_periods(periods):
+    """
+    free_capacity_by_room_type() for several (start_date, end_date) periods
+    in a single query. Returns {period: {'single': 3, 'double': 10}, ...}
+    """
+    periods = list(dict.fromkeys(periods))
+    free_capacity = {period: {room_type: 0 for room_type, _ in Room.ROOM_TYPE_CHOICES} for period in periods}
+    if not periods:
+        return free_capacity
+    rows = Room.objects.filter(status='available').order_by().values('room_type').annotate(**{
+        f'free_{i}': Sum(free_beds_expression(booked_beds_expression(start_date, end_date)))
+        for i, (start_date, end_date) in enumerate(periods)
+    })
+    for row in rows:
+        for i, period in enumerate(periods):
+            free_capacity[period][row['room_type']] = row[f'free_{i}'] or 0
+    return free_capacity
+
+
+# "How many single/double spots are left this semester?" is asked by every
+# visit to the apply and manage pages, so the answer is kept per semester in
+# the cache. signals.py drops it when applications, assignments, rooms or
+# semesters change; bulk queries must call invalidate_semester_availability().
+#
+# Dropping works by bumping a version number that is part of the cache key,
+# so a summary that was being worked out from the old rows while the change
+# happened is stored under the old version and never read. Applications and
+# semesters have a version per semester; rooms and assignments share one for
+# all semesters, since finding the semesters a stay overlaps would cost a
+# query on every save. When a summary is missing, one request works it out
+# while the others wait for it for up to SEMESTER_AVAILABILITY_LOCK_SECONDS
+# instead of all hitting the database at once.
+
+SEMESTER_AVAILABILITY_CACHE_PREFIX = 'hostel:semester_availability'
+SEMESTER_AVAILABILITY_LOCK_SECONDS = 5
+SEMESTER_AVAILABILITY_WAIT_STEP = 0.05
+
+
+def _beds_version_key():
+    return f'{SEMESTER_AVAILABILITY_CACHE_PREFIX}:beds'
+
+
+def _semester_version_key(semester_id):
+    return f'{SEMESTER_AVAILABILITY_CACHE_PREFIX}:semester:{semester_id}'
+
+
+def invalidate_semester_availability(semester_ids=None):
+    """Drop the cached summaries of these semesters, or of all of them when semester_ids is None"""
+    if semester_ids is None:
+        keys = [_beds_version_key()]
+    else:
+        keys = [_semester_version_key(semester_id) for semester_id in set(semester_ids)]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not in the cache (any more): any new number will do
+            cache.set(key, time.time_ns(), None)
+
+
+def _summary_keys(semester_ids):
+    """The current cache key of each semester's summary"""
+    version_keys = [_beds_version_key()] + [_semester_version_key(semester_id) for semester_id in semester_ids]
+    versions = cache.get_many(version_keys)
+    for key in version_keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    beds_version = versions[_beds_version_key()]
+    return {
+        semester_id: f'{SEMESTER_AVAILABILITY_CACHE_PREFIX}:{semester_id}:{beds_version}:{versions[_semester_version_key(semester_id)]}'
+        for semester_id in semester_ids
+    }
+
+
+def compute_semester_availability(semesters):
+    """
+    Quota and free beds per room type for each semester (two queries once
+    the quota counters exist).
+    Returns {semester_id: {'single': {...}, 'double': {...}}} where each
+    room type has quota, approved, pending, remaining_quota (pending
+    applications hold a place, as in admit_application), free_beds and spots
+    (what can still be approved: the smaller of remaining_quota and free_beds)
+    """
+    semesters = list(semesters)
+    room_types = [room_type for room_type, _ in Room.ROOM_TYPE_CHOICES]
+    usage = SemesterQuotaUsage.counts_for_semesters(semester.id for semester in semesters)
+    free_capacity = free_capacity_for_periods([(semester.start_date, semester.end_date) for semester in semesters])
+
+    summaries = {}
+    for semester in semesters:
+        summary = {}
+        for room_type in room_types:
+            quota = semester.get_quota(room_type)
+            counts = usage[semester.id][room_type]
+            remaining_quota = max(0, quota - counts['approved'] - counts['pending'])
+            free_beds = free_capacity[(semester.start_date, semester.end_date)][room_type]
+            summary[room_type] = {
+                'quota': quota,
+                'approved': counts['approved'],
+                'pending': counts['pending'],
+                'remaining_quota': remaining_quota,
+                'free_beds': free_beds,
+                'spots': min(remaining_quota, free_beds),
+            }
+        summaries[semester.id] = summary
+    return summaries
+
+
+def get_semester_availability(semesters):
+    """
+    The summaries of compute_semester_availability() for these semesters,
+    from the cache where possible. Missing ones are worked out together,
+    so this runs a fixed number of queries however many semesters there are.
+    """
+    semesters = {semester.id: semester for semester in semesters}
+    keys = _summary_keys(list(semesters))
+    found = cache.get_many(list(keys.values()))
+    summaries = {semester_id: found[key] for semester_id, key in keys.items() if key in found}
+    missing = [semester_id for semester_id in semesters if semester_id not in summaries]
+    if not missing:
+        return summaries
+
+    # Work out the summaries nobody else is working out already...
+    mine = [
+        semester_id for semester_id in missing
+        if cache.add(f'{keys[semester_id]}:lock', True, SEMESTER_AVAILABILITY_LOCK_SECONDS)
+    ]
+    others = [semester_id for semester_id in missing if semester_id not in mine]
+    if mine:
+        try:
+            computed = compute_semester_availability(semesters[semester_id] for semester_id in mine)
+            cache.set_many(
+                {keys[semester_id]: summary for semester_id, summary in computed.items()},
+                settings.SEMESTER_AVAILABILITY_CACHE_SECONDS
+            )
+        finally:
+            cache.delete_many([f'{keys[semester_id]}:lock' for semester_id in mine])
+        summaries.update(computed)
+
+    # ...and wait for the others, working them out here if that takes too long
+    deadline = time.monotonic() + SEMESTER_AVAILABILITY_LOCK_SECONDS
+    while others and time.monotonic() < deadline:
+        time.sleep(SEMESTER_AVAILABILITY_WAIT_STEP)
+        found = cache.get_many([keys[semester_id] for semester_id in others])
+        for semester_id in list(others):
+            if keys[semester_id] in found:
+                summaries[semester_id] = found[keys[semester_id]]
+                others.remove(semester_id)
+    if others:
+        summaries.update(compute_semester_availability(semesters[semester_id] for semester_id in others))
+    return summaries
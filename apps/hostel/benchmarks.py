@@ -0,0 +1,166 @@
+import datetime
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .availability import free_capacity_by_room_type
+from .models import HostelApplication, MaintenanceRequest, Payment, Room, RoomAssignment, Semester
+from .reports import get_room_statistics, invalidate_room_statistics
+
+User = get_user_model()
+
+# Benchmarks for the pages and model methods that get slow as the hostel
+# grows. Run them on a dataset from `python manage.py generate_dataset` and
+# compare the JSON results of two runs with `run_benchmarks --compare`.
+# Benchmarks that change data run inside a transaction that is rolled back,
+# so every repeat starts from the same rows. Pages with a cached snapshot
+# are timed twice: cold (the cache is dropped before every repeat) and
+# cached.
+
+
+def _get_page(url_name):
+    def run(client):
+        response = client.get(reverse(url_name))
+        if response.status_code >= 400:
+            raise RuntimeError(f'{url_name} returned {response.status_code}')
+    return run
+
+
+def _occupancy_series_five_years(client):
+    today = timezone.now().date()
+    response = client.get(reverse('hostel:occupancy_series'), {
+        'start': (today - datetime.timedelta(days=4 * 365)).isoformat(),
+        'end': (today + datetime.timedelta(days=365)).isoformat(),
+        'interval': 'week',
+    })
+    if response.status_code >= 400:
+        raise RuntimeError(f'occupancy_series returned {response.status_code}')
+
+
+def _check_expired_assignments(client):
+    RoomAssignment.check_expired_assignments()
+
+
+def _update_all_room_statuses(client):
+    for room in Room.objects.all():
+        room.update_status()
+
+
+def _update_statuses_in_bulk(client):
+    Room.update_statuses()
+
+
+def _free_capacity_this_semester(client):
+    today = timezone.now().date()
+    free_capacity_by_room_type(today, today + datetime.timedelta(days=119))
+
+
+# (name, function, changes data, run before every repeat without timing it)
+BENCHMARKS = [
+    ('view:room_statistics', _get_page('hostel:room_statistics'), False, invalidate_room_statistics),
+    ('view:room_statistics:cached', _get_page('hostel:room_statistics'), False, get_room_statistics),
+    ('view:occupancy_series', _occupancy_series_five_years, False, None),
+    ('view:list_rooms', _get_page('hostel:list_rooms'), False, None),
+    ('view:all_applications', _get_page('hostel:all_applications'), False, None),
+    ('view:manage_payments', _get_page('hostel:manage_payments'), False, None),
+    ('view:staff_dashboard', _get_page('accounts:staff_dashboard'), False, None),
+    ('view:update_room_statuses', _get_page('hostel:update_room_statuses'), True, None),
+    ('model:check_expired_assignments', _check_expired_assignments, True, None),
+    ('model:Room.update_status', _update_all_room_statuses, True, None),
+    ('model:Room.update_statuses', _update_statuses_in_bulk, True, None),
+    ('query:free_capacity_by_room_type', _free_capacity_this_semester, False, None),
+]
+
+
+class QueryCounter:
+    """Database execute wrapper that counts queries (connection.queries stops at 9000)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def dataset_size():
+    """Row counts of the main tables, saved with the results so runs can be compared"""
+    return {
+        'students': User.objects.filter(user_type='student').count(),
+        'rooms': Room.objects.count(),
+        'semesters': Semester.objects.count(),
+        'applications': HostelApplication.objects.count(),
+        'assignments': RoomAssignment.objects.count(),
+        'payments': Payment.objects.count(),
+        'maintenance_requests': MaintenanceRequest.objects.count(),
+    }
+
+
+def run_benchmarks(repeat=3, names=None):
+    """
+    Run every benchmark (or only those in `names`) `repeat` times.
+    Pages are opened as the first staff or admin user.
+    Returns a dict that can be saved as JSON.
+    """
+    staff = User.objects.filter(user_type__in=['staff', 'admin']).order_by('id').first()
+    if staff is None:
+        raise ValueError('A staff or admin user is needed to open the staff pages')
+
+    results = {}
+    # The test client talks to the 'testserver' host
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        client = Client()
+        client.force_login(staff)
+        for name, function, changes_data, setup in BENCHMARKS:
+            if names and name not in names:
+                continue
+            timings = []
+            for _ in range(repeat):
+                if setup:
+                    setup()
+                counter = QueryCounter()
+                with transaction.atomic():
+                    with connection.execute_wrapper(counter):
+                        started = time.perf_counter()
+                        function(client)
+                        timings.append(time.perf_counter() - started)
+                    if changes_data:
+                        transaction.set_rollback(True)
+            results[name] = {
+                'median_seconds': round(statistics.median(timings), 6),
+                'min_seconds': round(min(timings), 6),
+                'max_seconds': round(max(timings), 6),
+                'queries': counter.count,
+            }
+
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'repeat': repeat,
+        'dataset': dataset_size(),
+        'results': results,
+    }
+
+
+def compare_results(old, new):
+    """
+    Rows of (name, old median, new median, change in percent, old queries, new queries)
+    for the benchmarks found in both runs
+    """
+    rows = []
+    for name, result in new['results'].items():
+        previous = old['results'].get(name)
+        if not previous:
+            continue
+        change = None
+        if previous['median_seconds']:
+            change = (result['median_seconds'] - previous['median_seconds']) / previous['median_seconds'] * 100
+        rows.append((
+            name, previous['median_seconds'], result['median_seconds'], change,
+            previous['queries'], result['queries']
+        ))
+    return rows
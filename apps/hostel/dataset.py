@@ -0,0 +1,191 @@
+import datetime
+import random
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from .availability import invalidate_semester_availability
+from .models import (
+    HostelApplication, MaintenanceRequest, Payment, Room, RoomAssignment, RoomOccupancyDay, Semester,
+    SemesterQuotaUsage,
+)
+from .reports import invalidate_room_statistics
+
+User = get_user_model()
+
+# Synthetic data for performance work. Everything is written with
+# bulk_create and every random choice comes from one seeded generator, so the
+# same options always give the same rows. Generated rows are marked with the
+# prefixes below so they can be removed again without touching real data.
+
+USERNAME_PREFIX = 'gen_'
+ROOM_PREFIX = 'GEN'
+SEMESTER_PREFIX = 'Generated'
+SEMESTER_DAYS = 119
+
+FIRST_NAMES = ['Aisha', 'Wei', 'Arjun', 'Nur', 'Jia', 'Daniel', 'Siti', 'Kumar', 'Mei', 'Hafiz']
+LAST_NAMES = ['Tan', 'Lim', 'Abdullah', 'Raj', 'Wong', 'Ismail', 'Lee', 'Chen', 'Ahmad', 'Singh']
+
+
+def clear_dataset():
+    """Delete every generated row. Returns the number of rows deleted."""
+    with transaction.atomic():
+        deleted, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        deleted += Room.objects.filter(room_number__startswith=ROOM_PREFIX).delete()[0]
+        deleted += Semester.objects.filter(name__startswith=SEMESTER_PREFIX).delete()[0]
+    invalidate_room_statistics()
+    invalidate_semester_availability()
+    return deleted
+
+
+def generate_dataset(students=1000, rooms=200, semesters=3, maintenance_requests=None,
+                     occupancy=0.9, seed=0, batch_size=1000):
+    """
+    Create `students` students, `rooms` rooms (half single, half double) and
+    `semesters` back-to-back semesters ending with the current one. Every
+    semester gets applications from a sample of the students, room
+    assignments and payments for about `occupancy` of the beds, and the rest
+    of its applications pending or rejected.
+
+    Assignments of the last finished semester are left active, like a hostel
+    where check_expired_assignments hasn't run yet; older ones are completed.
+    The quota counters, occupancy index and room statuses are rebuilt at the
+    end. Returns the number of rows created per model.
+    """
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    now = timezone.now()
+    if maintenance_requests is None:
+        maintenance_requests = students // 10
+
+    with transaction.atomic():
+        staff = User(
+            username=f'{USERNAME_PREFIX}staff', user_type='staff', first_name='Generated', last_name='Staff',
+            password=make_password('password123')
+        )
+        staff.save()
+
+        # Hashing is slow, so every generated student shares the same password
+        password = make_password('password123')
+        student_rows = User.objects.bulk_create([
+            User(
+                username=f'{USERNAME_PREFIX}{i:06d}',
+                password=password,
+                user_type='student',
+                student_type='international' if rng.random() < 0.2 else 'local',
+                student_id=f'GEN{i:07d}',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                gender=rng.choice(['male', 'female']),
+            ) for i in range(students)
+        ], batch_size=batch_size)
+
+        room_rows = Room.objects.bulk_create([
+            Room(
+                room_number=f'{ROOM_PREFIX}{i:05d}',
+                room_type='single' if i % 2 == 0 else 'double',
+                status='maintenance' if rng.random() < 0.02 else 'available',
+            ) for i in range(rooms)
+        ], batch_size=batch_size)
+
+        # The last semester is the current one (started 30 days ago)
+        current_start = today - datetime.timedelta(days=30)
+        semester_rows = Semester.objects.bulk_create([
+            Semester(
+                name=f'{SEMESTER_PREFIX} {k + 1:02d}, Trimester {k % 3 + 1}',
+                start_date=current_start - datetime.timedelta(days=(semesters - 1 - k) * (SEMESTER_DAYS + 1)),
+                end_date=current_start + datetime.timedelta(
+                    days=SEMESTER_DAYS - 1 - (semesters - 1 - k) * (SEMESTER_DAYS + 1)
+                ),
+                application_start=now - datetime.timedelta(days=(semesters - 1 - k) * (SEMESTER_DAYS + 1) + 90),
+                application_end=now - datetime.timedelta(days=(semesters - 1 - k) * (SEMESTER_DAYS + 1) - 30),
+                is_active=k == semesters - 1,
+                quota_single=len([r for r in room_rows if r.room_type == 'single']),
+                quota_double=len([r for r in room_rows if r.room_type == 'double']),
+            ) for k in range(semesters)
+        ], batch_size=batch_size)
+
+        counts = {'students': len(student_rows), 'rooms': len(room_rows), 'semesters': len(semester_rows),
+                  'applications': 0, 'assignments': 0, 'payments': 0, 'maintenance_requests': 0}
+        usable_rooms = [room for room in room_rows if room.status != 'maintenance']
+        last_finished = max((s for s in semester_rows if s.end_date < today), key=lambda s: s.end_date, default=None)
+
+        for semester in semester_rows:
+            applications, assignments = _semester_rows(rng, semester, student_rows, usable_rooms, occupancy)
+            HostelApplication.objects.bulk_create(applications, batch_size=batch_size)
+            if semester.end_date < today and semester != last_finished:
+                for assignment in assignments:
+                    assignment.status = 'completed'
+            RoomAssignment.objects.bulk_create(assignments, batch_size=batch_size)
+            Payment.objects.bulk_create([
+                Payment(
+                    student=assignment.student,
+                    room_assignment=assignment,
+                    amount=assignment.calculate_payment_amount(semester),
+                    payment_period_start=assignment.start_date,
+                    payment_period_end=assignment.end_date,
+                    payment_method='cash',
+                    status='completed' if semester.end_date < today or rng.random() < 0.5 else 'pending',
+                ) for assignment in assignments
+            ], batch_size=batch_size)
+            counts['applications'] += len(applications)
+            counts['assignments'] += len(assignments)
+            counts['payments'] += len(assignments)
+
+        counts['maintenance_requests'] = len(MaintenanceRequest.objects.bulk_create([
+            MaintenanceRequest(
+                student=rng.choice(student_rows),
+                request_type=rng.choice(MaintenanceRequest.REQUEST_TYPE_CHOICES)[0],
+                room_number=rng.choice(room_rows).room_number,
+                description='Generated maintenance request',
+                priority=rng.choice(MaintenanceRequest.PRIORITY_CHOICES)[0],
+                status=rng.choice(MaintenanceRequest.STATUS_CHOICES)[0],
+            ) for _ in range(maintenance_requests if room_rows and student_rows else 0)
+        ], batch_size=batch_size))
+
+        # bulk_create skips save(), so rebuild what save() normally keeps up to date
+        SemesterQuotaUsage.reconcile(fix=True)
+        RoomOccupancyDay.rebuild(batch_size=batch_size * 5)
+        Room.update_statuses(Room.objects.filter(room_number__startswith=ROOM_PREFIX))
+    invalidate_room_statistics()
+    invalidate_semester_availability()
+
+    return counts
+
+
+def _semester_rows(rng, semester, students, rooms, occupancy):
+    """Unsaved applications and assignments for one semester"""
+    beds = [room for room in rooms for _ in range(room.capacity)]
+    rng.shuffle(beds)
+    filled = beds[:int(len(beds) * occupancy)]
+    # Some extra applicants didn't get a bed
+    applicants = rng.sample(students, min(len(students), int(len(filled) * 1.2) + 1))
+
+    applications = []
+    assignments = []
+    for i, student in enumerate(applicants):
+        if i < len(filled):
+            room = filled[i]
+            status = 'approved'
+        else:
+            room = None
+            status = rng.choice(['pending', 'rejected'])
+        application = HostelApplication(
+            student=student,
+            room_type=room.room_type if room else rng.choice(['single', 'double']),
+            semester=semester,
+            status=status,
+            start_date=semester.start_date,
+            end_date=semester.end_date,
+        )
+        applications.append(application)
+        if room:
+            assignments.append(RoomAssignment(
+                student=student,
+                room=room,
+                hostel_application=application,
+                start_date=semester.start_date,
+                end_date=semester.end_date,
+                payment_status='paid' if rng.random() < 0.7 else 'pending',
+            ))
+    return applications, assignments
@@ -0,0 +1,267 @@
+import csv
+import json
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .availability import rooms_with_free_beds
+from .models import HostelApplication, Payment, RoomAssignment
+
+# Streaming exports of applications, room assignments and payments, for the
+# export URLs and the `export_data` command. Rows are read with
+# QuerySet.iterator() and written out as they arrive, so memory use stays
+# the same however many rows there are.
+#
+# The filters are the ones of the matching staff pages (all_applications,
+# list_rooms and manage_payments) and take the same GET parameters.
+
+EXPORT_CHUNK_SIZE = 2000
+# Bytes of CSV/JSONL collected before they are handed on (or compressed)
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# CSV cells starting with one of these would be run as a formula by
+# spreadsheets, so they get a leading quote. Names and special requests
+# are typed in by students.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def application_filters(params):
+    """The all_applications filters in a dict or QueryDict of GET parameters"""
+    return {
+        'semester': _int(params.get('semester')),
+        'status': params.get('status') or '',
+        'room_type': params.get('room_type') or '',
+        'student_type': params.get('student_type') or '',
+    }
+
+
+def filter_applications(applications, filters):
+    if filters['semester']:
+        applications = applications.filter(semester_id=filters['semester'])
+    if filters['status']:
+        applications = applications.filter(status=filters['status'])
+    if filters['room_type']:
+        applications = applications.filter(room_type=filters['room_type'])
+    if filters['student_type']:
+        applications = applications.filter(student__student_type=filters['student_type'])
+    return applications
+
+
+def room_filters(params):
+    """The list_rooms filters (status is the room status)"""
+    return {
+        'room_type': params.get('room_type') or '',
+        'status': params.get('status') or '',
+        'block': (params.get('block') or '').strip(),
+        'min_free_beds': _int(params.get('min_free_beds')),
+    }
+
+
+def filter_rooms(rooms, filters):
+    """The rooms must be annotated with free_beds (see rooms_with_free_beds)"""
+    if filters['room_type']:
+        rooms = rooms.filter(room_type=filters['room_type'])
+    if filters['status']:
+        rooms = rooms.filter(status=filters['status'])
+    if filters['block']:
+        rooms = rooms.filter(room_number__istartswith=filters['block'])
+    if filters['min_free_beds'] is not None:
+        rooms = rooms.filter(free_beds__gte=filters['min_free_beds'])
+    return rooms
+
+
+def assignment_filters(params):
+    """The list_rooms filters for the assignments' rooms, plus the semester and ?assignment_status="""
+    return {
+        **room_filters(params),
+        'semester': _int(params.get('semester')),
+        'assignment_status': params.get('assignment_status') or '',
+    }
+
+
+def filter_assignments(assignments, filters):
+    if filters['semester']:
+        assignments = assignments.filter(hostel_application__semester_id=filters['semester'])
+    if filters['assignment_status']:
+        assignments = assignments.filter(status=filters['assignment_status'])
+    if any(filters[name] not in ('', None) for name in ('room_type', 'status', 'block', 'min_free_beds')):
+        rooms = filter_rooms(rooms_with_free_beds(timezone.now().date()), filters)
+        assignments = assignments.filter(room__in=rooms.values('id'))
+    return assignments
+
+
+def listed_payments():
+    """The payments manage_payments lists: those of approved applications with a room assignment"""
+    return Payment.objects.filter(
+        room_assignment__isnull=False,
+        room_assignment__hostel_application__status='approved',
+    ).select_related('student', 'room_assignment__room', 'room_assignment__hostel_application__semester')
+
+
+def payment_filters(params):
+    """The manage_payments filters"""
+    return {
+        'status': params.get('status') or '',
+        'semester': _int(params.get('semester')),
+    }
+
+
+def filter_payments(payments, filters):
+    if filters['status']:
+        payments = payments.filter(status=filters['status'])
+    if filters['semester']:
+        payments = payments.filter(room_assignment__hostel_application__semester_id=filters['semester'])
+    return payments
+
+
+class Export:
+    def __init__(self, queryset, parse_filters, apply_filters, columns):
+        self.queryset = queryset
+        self.parse_filters = parse_filters
+        self.apply_filters = apply_filters
+        # (column name, attribute path with '__' between related objects)
+        self.columns = columns
+
+    def rows(self, params):
+        """Values of every column for each matching object, read in chunks"""
+        objects = self.apply_filters(self.queryset(), self.parse_filters(params))
+        for obj in objects.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield [_value(obj, path) for _, path in self.columns]
+
+
+def _value(obj, path):
+    for name in path.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, name)
+    return obj
+
+
+EXPORTS = {
+    'applications': Export(
+        lambda: HostelApplication.objects.select_related('student', 'semester').order_by('date_applied', 'id'),
+        application_filters, filter_applications,
+        [
+            ('id', 'id'),
+            ('username', 'student__username'),
+            ('student_id', 'student__student_id'),
+            ('first_name', 'student__first_name'),
+            ('last_name', 'student__last_name'),
+            ('student_type', 'student__student_type'),
+            ('semester', 'semester__name'),
+            ('room_type', 'room_type'),
+            ('status', 'status'),
+            ('date_applied', 'date_applied'),
+            ('start_date', 'start_date'),
+            ('end_date', 'end_date'),
+            ('is_auto_rejected', 'is_auto_rejected'),
+            ('rejection_reason', 'rejection_reason'),
+            ('special_requests', 'special_requests'),
+        ],
+    ),
+    'assignments': Export(
+        lambda: RoomAssignment.objects.select_related(
+            'student', 'room', 'hostel_application__semester'
+        ).order_by('start_date', 'id'),
+        assignment_filters, filter_assignments,
+        [
+            ('id', 'id'),
+            ('username', 'student__username'),
+            ('student_id', 'student__student_id'),
+            ('first_name', 'student__first_name'),
+            ('last_name', 'student__last_name'),
+            ('room_number', 'room__room_number'),
+            ('room_type', 'room__room_type'),
+            ('semester', 'hostel_application__semester__name'),
+            ('application_id', 'hostel_application_id'),
+            ('start_date', 'start_date'),
+            ('end_date', 'end_date'),
+            ('status', 'status'),
+            ('payment_status', 'payment_status'),
+        ],
+    ),
+    'payments': Export(
+        lambda: listed_payments().order_by('payment_period_start', 'id'),
+        payment_filters, filter_payments,
+        [
+            ('id', 'id'),
+            ('username', 'student__username'),
+            ('student_id', 'student__student_id'),
+            ('first_name', 'student__first_name'),
+            ('last_name', 'student__last_name'),
+            ('room_number', 'room_assignment__room__room_number'),
+            ('semester', 'room_assignment__hostel_application__semester__name'),
+            ('amount', 'amount'),
+            ('status', 'status'),
+            ('payment_method', 'payment_method'),
+            ('payment_period_start', 'payment_period_start'),
+            ('payment_period_end', 'payment_period_end'),
+        ],
+    ),
+}
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Line:
+    """File-like object for csv.writer that hands back the line it was given"""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(name, params, fmt='csv'):
+    """The export as text lines: a CSV header and rows, or one JSON object per row"""
+    export = EXPORTS[name]
+    names = [column for column, _ in export.columns]
+    if fmt == 'csv':
+        writer = csv.writer(_Line())
+        yield writer.writerow(names)
+        for row in export.rows(params):
+            yield writer.writerow([_csv_cell(value) for value in row])
+    elif fmt == 'jsonl':
+        for row in export.rows(params):
+            yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+    else:
+        raise ValueError(f'Unknown export format: {fmt}')
+
+
+def export_chunks(name, params, fmt='csv', compress=False):
+    """The export as bytes in chunks of about EXPORT_BUFFER_SIZE, gzipped if asked"""
+    # wbits=31 writes a gzip header, so the output is a normal .gz file
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer, size = [], 0
+    for line in export_lines(name, params, fmt):
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= EXPORT_BUFFER_SIZE:
+            chunk = b''.join(buffer)
+            buffer, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_filename(name, fmt, compress, today):
+    return f'{name}-{today.isoformat()}.{fmt}' + ('.gz' if compress else '')
@@ -1,6 +1,7 @@
 from django import forms
 from django.utils import timezone
 from .models import HostelApplication, MaintenanceRequest, Semester, RoomAssignment, Room
+from .availability import rooms_with_free_space
 
 # Form for semester management
 class SemesterForm(forms.ModelForm):
@@ -201,14 +202,15 @@ class RoomAssignmentForm(forms.ModelForm):
         end_date = kwargs.pop('end_date', None)
         application = kwargs.pop('application', None)
         super().__init__(*args, **kwargs)
-        qs = Room.objects.filter(status='available')
-        if application:
-            qs = qs.filter(room_type=application.room_type)
+        room_type = application.room_type if application else None
 
         if start_date and end_date:
-            available_room_ids = [room.id for room in qs if not room.is_full_for_period(start_date, end_date)]
-            self.fields['room'].queryset = qs.filter(id__in=available_room_ids)
+            # Only rooms that still have a free spot for the period (worked out in SQL)
+            self.fields['room'].queryset = rooms_with_free_space(start_date, end_date, room_type).order_by('room_number')
         else:
+            qs = Room.objects.filter(status='available')
+            if room_type:
+                qs = qs.filter(room_type=room_type)
             self.fields['room'].queryset = qs
 
     def clean(self):
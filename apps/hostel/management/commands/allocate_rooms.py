@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.hostel.allocation import allocate_rooms
+from apps.hostel.models import Semester
+
+class Command(BaseCommand):
+    help = 'Assign rooms to every approved application of a semester that does not have a room yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semester', type=int, required=True, help='ID of the semester to allocate rooms for')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be assigned without saving anything')
+
+    def handle(self, *args, **options):
+        try:
+            semester = Semester.objects.get(id=options['semester'])
+        except Semester.DoesNotExist:
+            raise CommandError(f"Semester {options['semester']} does not exist")
+
+        self.stdout.write(self.style.SUCCESS(f'Allocating rooms for {semester.name}...'))
+        started = time.monotonic()
+
+        result = allocate_rooms(semester, dry_run=options['dry_run'])
+
+        for room_type, assigned in result['assigned'].items():
+            self.stdout.write(f"{room_type.title()} rooms: {assigned} assigned, {result['unassigned'][room_type]} left without a room")
+        prefix = 'Dry run: would have assigned' if options['dry_run'] else 'Assigned'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {sum(result['assigned'].values())} room(s) in {time.monotonic() - started:.2f}s"
+        ))
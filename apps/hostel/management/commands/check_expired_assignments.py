@@ -1,17 +1,55 @@
-from django.core.management.base import BaseCommand
+import argparse
+import time
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from apps.hostel.models import RoomAssignment
+from apps.hostel.models import JobWatermark, Room, RoomAssignment
+
+WATERMARK = 'check_expired_assignments'
 
 class Command(BaseCommand):
     help = 'Check for expired room assignments and mark them as completed'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of assignments completed per query')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the expired assignments, do not change anything')
+        # Every run checks all assignments; --full is still accepted for older schedules
+        parser.add_argument('--full', action='store_true', help=argparse.SUPPRESS)
+
     def handle(self, *args, **options):
-        self.stdout.write(self.style.SUCCESS('Checking for expired room assignments...'))
-        
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        today = timezone.now().date()
+        # Only reported: assignments created or edited after the last run
+        # can have ended before it, so every run checks all of them
+        last_run = JobWatermark.get_date(WATERMARK)
+        if last_run:
+            self.stdout.write(self.style.SUCCESS(f'Checking for expired room assignments (last run on {last_run})...'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Checking for expired room assignments...'))
+        started = time.monotonic()
+
+        def report(done, total):
+            self.stdout.write(f'{done}/{total} assignment(s) processed ({time.monotonic() - started:.2f}s)')
+
         # Call the class method to check and update expired assignments
-        count = RoomAssignment.check_expired_assignments()
-        
+        count = RoomAssignment.check_expired_assignments(
+            batch_size=options['batch_size'], dry_run=options['dry_run'], progress=report
+        )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: {count} expired assignment(s) would be marked as completed'))
+            return
+
         if count > 0:
             self.stdout.write(self.style.SUCCESS(f'Successfully marked {count} expired assignment(s) as completed'))
         else:
-            self.stdout.write(self.style.SUCCESS('No expired assignments found')) 
\ No newline at end of file
+            self.stdout.write(self.style.SUCCESS('No expired assignments found'))
+        JobWatermark.set_date(WATERMARK, today)
+
+        # Catch rooms whose status went stale without an assignment changing
+        # (e.g. a stay that started or ended today)
+        changed = Room.update_statuses()
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the status of {changed} room(s), finished in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,51 @@
+import sys
+import time
+from django.core.management.base import BaseCommand
+from apps.hostel.exports import EXPORTS, FORMATS, export_chunks
+
+class Command(BaseCommand):
+    help = 'Export applications, room assignments or payments as CSV or JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS), help='What to export')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv', help='Output format (default: csv)')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--output', help='File to write to (default: standard output)')
+        # The filters of the staff pages
+        parser.add_argument('--semester', type=int, help='Only this semester (id)')
+        parser.add_argument('--status', help='Only this status (for assignments: the room status)')
+        parser.add_argument('--room-type', help='Only this room type')
+        parser.add_argument('--student-type', help='Only this student type (applications)')
+        parser.add_argument('--block', help='Only rooms whose number starts with this (assignments)')
+        parser.add_argument('--min-free-beds', type=int, help='Only rooms with at least this many free beds (assignments)')
+        parser.add_argument('--assignment-status', help='Only assignments with this status (assignments)')
+
+    def handle(self, *args, **options):
+        params = {
+            'semester': options['semester'],
+            'status': options['status'],
+            'room_type': options['room_type'],
+            'student_type': options['student_type'],
+            'block': options['block'],
+            'min_free_beds': options['min_free_beds'],
+            'assignment_status': options['assignment_status'],
+        }
+        started = time.monotonic()
+        chunks = export_chunks(options['name'], params, options['format'], options['gzip'])
+
+        written = 0
+        output = open(options['output'], 'wb') if options['output'] else None
+        try:
+            # The output is bytes (it may be gzipped), so skip self.stdout's text wrapper
+            target = output or sys.stdout.buffer
+            for chunk in chunks:
+                target.write(chunk)
+                written += len(chunk)
+        finally:
+            if output:
+                output.close()
+
+        if options['output']:
+            self.stderr.write(self.style.SUCCESS(
+                f"Wrote {written} bytes to {options['output']} in {time.monotonic() - started:.2f}s"
+            ))
@@ -0,0 +1,44 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from apps.hostel.dataset import USERNAME_PREFIX, clear_dataset, generate_dataset
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset (students, rooms, semesters, applications, payments) for performance testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Number of students to create')
+        parser.add_argument('--rooms', type=int, default=200, help='Number of rooms to create (half single, half double)')
+        parser.add_argument('--semesters', type=int, default=3, help='Number of back-to-back semesters, ending with the current one')
+        parser.add_argument('--maintenance-requests', type=int, help='Number of maintenance requests (default: one per 10 students)')
+        parser.add_argument('--occupancy', type=float, default=0.9, help='Share of beds filled in every semester (0 to 1)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows inserted per query')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data first')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['occupancy'] <= 1:
+            raise CommandError('--occupancy must be between 0 and 1')
+
+        if options['clear']:
+            deleted = clear_dataset()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} previously generated row(s)'))
+        elif get_user_model().objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError('Generated data already exists, run again with --clear to replace it')
+
+        self.stdout.write(self.style.SUCCESS('Generating dataset...'))
+        started = time.monotonic()
+
+        counts = generate_dataset(
+            students=options['students'],
+            rooms=options['rooms'],
+            semesters=options['semesters'],
+            maintenance_requests=options['maintenance_requests'],
+            occupancy=options['occupancy'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        )
+
+        for name, count in counts.items():
+            self.stdout.write(f"{name.replace('_', ' ').capitalize()}: {count}")
+        self.stdout.write(self.style.SUCCESS(f'Dataset generated in {time.monotonic() - started:.2f}s'))
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.hostel.admission import process_queued_applications
+
+class Command(BaseCommand):
+    help = 'Admit or reject queued hostel applications in the order they were submitted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of applications to process per transaction')
+        parser.add_argument('--loop', action='store_true', help='Keep running and poll for new applications')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait between polls when the queue is empty (with --loop)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Processing queued hostel applications...'))
+        total_admitted = total_rejected = 0
+
+        while True:
+            admitted, rejected = process_queued_applications(batch_size=options['batch_size'])
+            total_admitted += admitted
+            total_rejected += rejected
+            if admitted or rejected:
+                self.stdout.write(f'Processed {admitted + rejected} application(s): {admitted} admitted, {rejected} auto-rejected')
+                continue
+            if not options['loop']:
+                break
+            # Queue is empty, wait a bit before checking again
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {total_admitted} admitted, {total_rejected} auto-rejected'
+        ))
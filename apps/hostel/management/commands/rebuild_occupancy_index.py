@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.hostel.models import RoomOccupancyDay
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-room, per-day occupancy index from room assignments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of rows to read and write at a time')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Rebuilding room occupancy index...'))
+
+        count = RoomOccupancyDay.rebuild(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Occupancy index rebuilt with {count} room-day row(s)'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.hostel.admission import reconcile_auto_rejections
+from apps.hostel.models import Semester
+
+class Command(BaseCommand):
+    help = 'Auto-reject pending applications whose quota is used up or that have no free room left'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semester', type=int, help='Only check this semester (ID)')
+
+    def handle(self, *args, **options):
+        semesters = None
+        if options['semester']:
+            semesters = Semester.objects.filter(id=options['semester'])
+            if not semesters.exists():
+                raise CommandError(f"Semester {options['semester']} does not exist")
+
+        self.stdout.write(self.style.SUCCESS('Checking pending applications...'))
+
+        count = reconcile_auto_rejections(semesters)
+
+        if count > 0:
+            self.stdout.write(self.style.SUCCESS(f'Auto-rejected {count} pending application(s)'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No applications needed to be auto-rejected'))
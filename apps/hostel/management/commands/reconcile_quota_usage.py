@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from apps.hostel.models import SemesterQuotaUsage
+
+class Command(BaseCommand):
+    help = 'Check the semester quota counters against the real application counts and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift, do not repair it')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Checking semester quota counters...'))
+
+        drift = SemesterQuotaUsage.reconcile(fix=not options['dry_run'])
+
+        for semester_id, room_type, stored, actual in drift:
+            self.stdout.write(self.style.WARNING(
+                f'Semester {semester_id} ({room_type}): counter {stored or "missing"}, actual {actual}'
+            ))
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All quota counters are correct'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Found {len(drift)} drifted counter(s), run without --dry-run to repair'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drift)} drifted counter(s)'))
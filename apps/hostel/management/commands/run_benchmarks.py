@@ -0,0 +1,45 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from apps.hostel.benchmarks import BENCHMARKS, compare_results, run_benchmarks
+
+class Command(BaseCommand):
+    help = 'Time the slow hostel pages and model methods and save the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Number of times to run every benchmark')
+        parser.add_argument('--only', nargs='+', metavar='NAME', help='Only run these benchmarks')
+        parser.add_argument('--output', help='File to write the JSON results to')
+        parser.add_argument('--compare', metavar='FILE', help='JSON results of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        known = [name for name, _, _, _ in BENCHMARKS]
+        unknown = set(options['only'] or []) - set(known)
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(known)}")
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        self.stdout.write(self.style.SUCCESS('Running benchmarks...'))
+        try:
+            report = run_benchmarks(repeat=options['repeat'], names=options['only'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Dataset: {', '.join(f'{count} {name}' for name, count in report['dataset'].items())}")
+        for name, result in report['results'].items():
+            self.stdout.write(f"{name}: {result['median_seconds'] * 1000:.1f} ms median, {result['queries']} queries")
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as previous:
+                old = json.load(previous)
+            self.stdout.write(self.style.SUCCESS(f"Compared with {options['compare']}:"))
+            for name, old_time, new_time, change, old_queries, new_queries in compare_results(old, report):
+                change_text = f'{change:+.1f}%' if change is not None else 'n/a'
+                line = (f'{name}: {old_time * 1000:.1f} ms -> {new_time * 1000:.1f} ms ({change_text}), '
+                        f'{old_queries} -> {new_queries} queries')
+                self.stdout.write(self.style.WARNING(line) if change and change > 10 else line)
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.hostel.reports import invalidate_room_statistics
+from apps.hostel.rollups import rolled_up_through, update_daily_rollups
+
+class Command(BaseCommand):
+    help = 'Roll up applications and room occupancy per day for the reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=30, help='Also re-roll this many days before the last rolled-up day, to pick up status changes')
+        parser.add_argument('--backfill', action='store_true', help='Roll up all history again, from the first application or stay')
+
+    def handle(self, *args, **options):
+        if options['window'] < 1:
+            raise CommandError('--window must be at least 1')
+
+        self.stdout.write(self.style.SUCCESS('Updating daily rollups...'))
+        started = time.monotonic()
+
+        def report(start_date, end_date, application_rows, occupancy_rows):
+            self.stdout.write(
+                f'{start_date} to {end_date}: {application_rows} application row(s), '
+                f'{occupancy_rows} occupancy row(s) ({time.monotonic() - started:.2f}s)'
+            )
+
+        rolled = update_daily_rollups(window=options['window'], backfill=options['backfill'], progress=report)
+
+        if rolled is None:
+            self.stdout.write(self.style.SUCCESS('Nothing to roll up'))
+            return
+        invalidate_room_statistics()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {rolled[0]} to {rolled[1]} in {time.monotonic() - started:.2f}s '
+            f'(rollups now run through {rolled_up_through()})'
+        ))
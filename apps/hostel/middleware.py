@@ -0,0 +1,46 @@
+import logging
+import time
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCountMiddleware:
+    """
+    Development helper: logs how many SQL queries each request ran and how
+    long they took, e.g.
+
+        GET /hostel/rooms/ 200 - 17 queries, 12.4 ms SQL, 40.1 ms total
+
+    Lines are logged at INFO, so run with HOSTEL_LOG_LEVEL=INFO to see them.
+    Only added to MIDDLEWARE when DEBUG is on (see settings.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not logger.isEnabledFor(logging.INFO):
+            return self.get_response(request)
+
+        stats = {'queries': 0, 'sql_seconds': 0.0}
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats['queries'] += 1
+                stats['sql_seconds'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        total_seconds = time.perf_counter() - started
+
+        logger.info(
+            '%s %s %s - %d queries, %.1f ms SQL, %.1f ms total',
+            request.method, request.path, response.status_code,
+            stats['queries'], stats['sql_seconds'] * 1000, total_seconds * 1000
+        )
+        return response
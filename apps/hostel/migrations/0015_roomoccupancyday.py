@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0014_alter_payment_payment_method'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomOccupancyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('occupied', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_days', to='hostel.room')),
+            ],
+            options={
+                'unique_together': {('room', 'date')},
+            },
+        ),
+    ]
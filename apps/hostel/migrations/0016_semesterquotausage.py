@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0015_roomoccupancyday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SemesterQuotaUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(choices=[('single', 'Single Room (1 person per room)'), ('double', 'Double Room (2 persons per room)')], max_length=10)),
+                ('approved', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quota_usage', to='hostel.semester')),
+            ],
+            options={
+                'unique_together': {('semester', 'room_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0016_semesterquotausage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hostelapplication',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0018_jobwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('room_type', models.CharField(choices=[('single', 'Single Room'), ('double', 'Double Room')], max_length=10)),
+                ('occupied', models.PositiveIntegerField(default=0)),
+                ('beds', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('date', 'room_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ApplicationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('room_type', models.CharField(choices=[('single', 'Single Room (1 person per room)'), ('double', 'Double Room (2 persons per room)')], max_length=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], max_length=10)),
+                ('student_type', models.CharField(blank=True, max_length=15)),
+                ('applications', models.PositiveIntegerField(default=0)),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='application_rollups', to='hostel.semester')),
+            ],
+            options={
+                'unique_together': {('date', 'semester', 'room_type', 'status', 'student_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+def set_capacity(apps, schema_editor):
+    # Same numbers as Room.ROOM_CAPACITY
+    Room = apps.get_model('hostel', 'Room')
+    Room.objects.filter(room_type='double').update(capacity=2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0019_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='capacity',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(set_capacity, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='room',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('capacity', 2), ('room_type', 'double')), models.Q(models.Q(('room_type', 'double'), _negated=True), ('capacity', 1)), _connector='OR'), name='room_capacity_matches_room_type'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+def fill_waitlist(apps, schema_editor):
+    # Auto-rejected applications of students who haven't applied again since
+    HostelApplication = apps.get_model('hostel', 'HostelApplication')
+    newer = HostelApplication.objects.filter(
+        student=models.OuterRef('student'), date_applied__gt=models.OuterRef('date_applied')
+    )
+    HostelApplication.objects.filter(status='rejected', is_auto_rejected=True).exclude(
+        models.Exists(newer)
+    ).update(waitlisted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0020_room_capacity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostelapplication',
+            name='waitlisted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(fill_waitlist, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='hostelapplication',
+            index=models.Index(condition=models.Q(('waitlisted', True)), fields=['semester', 'room_type', 'date_applied', 'id'], name='hostel_application_waitlist'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """
+    AddIndex that builds the index with CREATE INDEX CONCURRENTLY on
+    PostgreSQL, so the table stays writable, and a plain CREATE INDEX on
+    other databases
+    """
+
+    def _concurrently(self, schema_editor):
+        return {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, **self._concurrently(schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, **self._concurrently(schema_editor))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run in a transaction. The indexes are
+    # all in place before the foreign key indexes they replace are dropped.
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hostel', '0021_application_waitlist'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='hostelapplication',
+            index=models.Index(fields=['semester', 'room_type', 'status'], name='hostel_app_semester_status'),
+        ),
+        AddIndexConcurrently(
+            model_name='hostelapplication',
+            index=models.Index(fields=['student', 'status', 'date_applied'], name='hostel_app_student_status'),
+        ),
+        AddIndexConcurrently(
+            model_name='maintenancerequest',
+            index=models.Index(fields=['status', 'date_submitted'], name='hostel_maint_status_date'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(fields=['student', 'status'], name='hostel_payment_student_status'),
+        ),
+        AddIndexConcurrently(
+            model_name='roomassignment',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['room', 'start_date', 'end_date'], name='hostel_assign_active_stay'),
+        ),
+        AddIndexConcurrently(
+            model_name='roomassignment',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['end_date'], name='hostel_assign_active_end'),
+        ),
+        AddIndexConcurrently(
+            model_name='roomassignment',
+            index=models.Index(fields=['student', 'status'], name='hostel_assign_student_status'),
+        ),
+        migrations.AlterField(
+            model_name='hostelapplication',
+            name='semester',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='hostel.semester'),
+        ),
+        migrations.AlterField(
+            model_name='hostelapplication',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='hostel_applications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='roomassignment',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='room_assignments', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
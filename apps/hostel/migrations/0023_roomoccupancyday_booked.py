@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:05
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_booked(apps, schema_editor):
+    # Active stays book the nights from their start date up to the day before their end date
+    RoomAssignment = apps.get_model('hostel', 'RoomAssignment')
+    RoomOccupancyDay = apps.get_model('hostel', 'RoomOccupancyDay')
+    booked = RoomAssignment.objects.filter(
+        room=models.OuterRef('room'), status='active',
+        start_date__lte=models.OuterRef('date'), end_date__gt=models.OuterRef('date'),
+    ).order_by().values('room').annotate(total=models.Count('id')).values('total')
+    RoomOccupancyDay.objects.update(booked=Coalesce(models.Subquery(booked), models.Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel', '0022_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomoccupancyday',
+            name='booked',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_booked, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,11 @@
-from django.db import models
+import datetime
+import logging
+import threading
+from functools import partial
+from django.db import models, transaction
+from django.db.models import Case, CharField, Count, Exists, F, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -7,6 +14,9 @@ from apps.accounts.models import User
 
 User = get_user_model()
 
+# Diagnostics go through the 'apps.hostel' logger (see LOGGING in settings)
+logger = logging.getLogger(__name__)
+
 # Create your models here.
 
 # Model to store semester info
@@ -41,10 +51,33 @@ class Semester(models.Model):
         now = timezone.now()
         return now > self.application_end
 
+    def get_quota(self, room_type):
+        """Quota in number of students (double room quota is stored as number of rooms)"""
+        if room_type == 'double':
+            return self.quota_double * 2
+        return self.quota_single
+
+    def get_approved_counts(self):
+        """
+        Approved applications per room type, read from the quota counters
+        Example: {'single': 3, 'double': 10}
+        """
+        return {
+            usage.room_type: usage.approved
+            for usage in SemesterQuotaUsage.get_for_semester(self)
+        }
+
+    def get_remaining_quota(self, room_type, approved_counts=None):
+        """How many more applications of this room type can be approved"""
+        if approved_counts is None:
+            approved_counts = self.get_approved_counts()
+        return max(0, self.get_quota(room_type) - approved_counts[room_type])
+
 # Model to store hostel applications submitted by students
 class HostelApplication(models.Model):
     # Link each application to a student user
-    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hostel_applications')
+    # Indexed by the (student, status, date_applied) index below
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hostel_applications', db_index=False)
 
     # Room type choices (single, double only)
     ROOM_TYPE_CHOICES = [
@@ -54,16 +87,23 @@ class HostelApplication(models.Model):
     room_type = models.CharField(max_length=10, choices=ROOM_TYPE_CHOICES)
 
     # Semester for which the application is made (FK to Semester)
-    semester = models.ForeignKey('Semester', on_delete=models.PROTECT)
+    # Indexed by the (semester, room_type, status) index below
+    semester = models.ForeignKey('Semester', on_delete=models.PROTECT, db_index=False)
 
     # Application status
+    # 'queued' is used when HOSTEL_QUEUED_INTAKE is on: the application has
+    # been received but the queue worker hasn't admitted or rejected it yet
     STATUS_CHOICES = [
+        ('queued', 'Queued'),
         ('pending', 'Pending'),
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
     ]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
 
+    # Statuses that count as the student's current application
+    ACTIVE_STATUSES = ['queued', 'pending', 'approved']
+
     # Date and time when the application was submitted
     date_applied = models.DateTimeField(auto_now_add=True)
 
@@ -74,17 +114,94 @@ class HostelApplication(models.Model):
     special_requests = models.TextField(blank=True, null=True, help_text="Any special requests by the student")
     rejection_reason = models.CharField(max_length=255, blank=True, null=True)
     is_auto_rejected = models.BooleanField(default=False, help_text="Auto-rejected due to quota reached")
+    # Auto-rejected applications wait on their semester and room type's
+    # waitlist, oldest first, until a place frees up (see waitlist.py)
+    waitlisted = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # Quota counts and auto-rejection of a semester and room type
+            models.Index(fields=['semester', 'room_type', 'status'], name='hostel_app_semester_status'),
+            # A student's current and latest applications
+            models.Index(fields=['student', 'status', 'date_applied'], name='hostel_app_student_status'),
+            # Only the waitlist is indexed, in waitlist order
+            models.Index(
+                fields=['semester', 'room_type', 'date_applied', 'id'],
+                condition=models.Q(waitlisted=True),
+                name='hostel_application_waitlist',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.room_type} ({self.start_date} to {self.end_date})"
 
-    def save(self, *args, **kwargs):
-        # Auto-set start and end dates from semester
+    # What this application currently counts as in SemesterQuotaUsage
+    # (set when the row is loaded from the database, refreshed or saved)
+    _counted_as = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {'semester_id', 'room_type', 'status'}:
+            instance._counted_as = instance.quota_key()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        # Only a refresh that read all of the key tells what the row counts as
+        # (loading one deferred field at a time doesn't)
+        loaded = set(fields) if fields is not None else None
+        if loaded is None or ({'room_type', 'status'} <= loaded and loaded & {'semester', 'semester_id'}):
+            if not self.get_deferred_fields() & {'semester_id', 'room_type', 'status'}:
+                self._counted_as = self.quota_key()
+
+    def quota_key(self):
+        """The (semester id, room type, status) this application is counted under"""
+        return (self.semester_id, self.room_type, self.status)
+
+    def set_dates_from_semester(self):
+        """Auto-set start and end dates from semester"""
         if not self.start_date:
             self.start_date = self.semester.start_date
         if not self.end_date:
             self.end_date = self.semester.end_date
-        super().save(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        self.set_dates_from_semester()
+        with transaction.atomic():
+            if not self._state.adding:
+                # Count from what is stored, not from what this copy was
+                # loaded with: it may be stale (saved by another request
+                # since) or not know it (deferred fields). The lock makes
+                # the next save of the row wait until this one is counted.
+                self._counted_as = type(self)._base_manager.select_for_update().filter(pk=self.pk).values_list(
+                    'semester_id', 'room_type', 'status'
+                ).first()
+            # Joins the waitlist when it is auto-rejected, leaves it when its status changes again
+            if self._state.adding or self.quota_key() != self._counted_as:
+                self.waitlisted = self.status == 'rejected' and self.is_auto_rejected
+            super().save(*args, **kwargs)
+            # Keep the quota counters in step with this application's status
+            new_key = self.quota_key()
+            SemesterQuotaUsage.move(self._counted_as, new_key)
+            self._counted_as = new_key
+
+    @classmethod
+    def auto_reject_pending(cls, semester, room_type, reason='Quota reached', **filters):
+        """
+        Reject every pending application for this semester and room type in one UPDATE
+        (extra filters, e.g. start_date=..., narrow it down further)
+        Returns the number of applications rejected
+        """
+        from .availability import invalidate_semester_availability
+        with transaction.atomic():
+            count = cls.objects.filter(
+                semester=semester, room_type=room_type, status='pending', **filters
+            ).update(status='rejected', rejection_reason=reason, is_auto_rejected=True, waitlisted=True)
+            if count:
+                SemesterQuotaUsage.add(semester.id, room_type, 'pending', -count)
+                transaction.on_commit(partial(invalidate_semester_availability, [semester.id]))
+        return count
 
     def get_daily_rate(self):
         """Get the daily rate based on student type and room type"""
@@ -128,6 +245,174 @@ class HostelApplication(models.Model):
             return True
         return False
 
+# Model to keep running totals of applications per semester and room type.
+# Saving a HostelApplication (and HostelApplication.auto_reject_pending())
+# updates these in the same transaction, so the remaining quota can be read
+# from one row instead of running COUNT queries on every page.
+# Use the reconcile_quota_usage command to check for and repair drift.
+class SemesterQuotaUsage(models.Model):
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name='quota_usage')
+    room_type = models.CharField(max_length=10, choices=HostelApplication.ROOM_TYPE_CHOICES)
+    approved = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+
+    # Application statuses that have a counter
+    COUNTED_STATUSES = ['approved', 'pending']
+
+    class Meta:
+        unique_together = ('semester', 'room_type')
+
+    def __str__(self):
+        return f"{self.semester_id} {self.room_type}: {self.approved} approved, {self.pending} pending"
+
+    @classmethod
+    def count_applications(cls, semester_id, room_type):
+        """Count the applications the slow way (used to create and reconcile counters)"""
+        counts = HostelApplication.objects.filter(
+            semester_id=semester_id, room_type=room_type, status__in=cls.COUNTED_STATUSES
+        ).values('status').annotate(total=models.Count('id'))
+        totals = {status: 0 for status in cls.COUNTED_STATUSES}
+        for row in counts:
+            totals[row['status']] = row['total']
+        return totals
+
+    @classmethod
+    def create_missing(cls, semester_id, room_types):
+        """Create counters that don't exist yet from the real counts"""
+        cls.objects.bulk_create(
+            [cls(semester_id=semester_id, room_type=room_type, **cls.count_applications(semester_id, room_type))
+             for room_type in room_types],
+            ignore_conflicts=True
+        )
+
+    @classmethod
+    def get_for_semester(cls, semester):
+        """Both counters (single and double) for a semester, created if needed"""
+        room_types = [room_type for room_type, _ in HostelApplication.ROOM_TYPE_CHOICES]
+        usage = list(cls.objects.filter(semester=semester))
+        if len(usage) < len(room_types):
+            cls.create_missing(semester.id, set(room_types) - {u.room_type for u in usage})
+            usage = list(cls.objects.filter(semester=semester))
+        return usage
+
+    @classmethod
+    def counts_for_semesters(cls, semester_ids):
+        """
+        Approved and pending applications per semester and room type, read
+        from the counters. Missing counters are created from the real counts,
+        all in the same few queries however many semesters there are.
+        Example: {1: {'single': {'approved': 3, 'pending': 1}, 'double': {...}}}
+        """
+        room_types = [room_type for room_type, _ in HostelApplication.ROOM_TYPE_CHOICES]
+        semester_ids = set(semester_ids)
+        counts = {semester_id: {} for semester_id in semester_ids}
+        for usage in cls.objects.filter(semester_id__in=semester_ids).values(
+            'semester_id', 'room_type', *cls.COUNTED_STATUSES
+        ):
+            counts[usage['semester_id']][usage['room_type']] = {status: usage[status] for status in cls.COUNTED_STATUSES}
+
+        missing = {semester_id for semester_id, usage in counts.items() if len(usage) < len(room_types)}
+        if missing:
+            actual = {
+                (semester_id, room_type): {status: 0 for status in cls.COUNTED_STATUSES}
+                for semester_id in missing for room_type in room_types if room_type not in counts[semester_id]
+            }
+            rows = HostelApplication.objects.filter(
+                semester_id__in=missing, status__in=cls.COUNTED_STATUSES
+            ).order_by().values('semester_id', 'room_type', 'status').annotate(total=models.Count('id'))
+            for row in rows:
+                key = (row['semester_id'], row['room_type'])
+                if key in actual:
+                    actual[key][row['status']] = row['total']
+            cls.objects.bulk_create(
+                [cls(semester_id=key[0], room_type=key[1], **real) for key, real in actual.items()],
+                ignore_conflicts=True
+            )
+            # Read them back in case another request created some of them first
+            for usage in cls.objects.filter(semester_id__in=missing).values(
+                'semester_id', 'room_type', *cls.COUNTED_STATUSES
+            ):
+                counts[usage['semester_id']][usage['room_type']] = {
+                    status: usage[status] for status in cls.COUNTED_STATUSES
+                }
+        return counts
+
+    @classmethod
+    def add(cls, semester_id, room_type, status, amount):
+        """
+        Add to (or subtract from) one counter.
+        Returns True if the counter row was missing and has been created
+        from the real counts instead.
+        """
+        if status not in cls.COUNTED_STATUSES or not amount:
+            return False
+        updated = cls.objects.filter(semester_id=semester_id, room_type=room_type).update(
+            **{status: F(status) + amount}
+        )
+        if not updated:
+            # First change for this semester and room type: the real counts
+            # already include it because we run after the application was saved
+            cls.create_missing(semester_id, [room_type])
+            return True
+        return False
+
+    @classmethod
+    def move(cls, old_key, new_key):
+        """Move one application from its old (semester, room type, status) to its new one"""
+        if old_key == new_key:
+            return
+        created = False
+        if old_key:
+            created = cls.add(*old_key, -1)
+        # A row just created from the real counts already has the application
+        # under its new status
+        if new_key and not (created and new_key[:2] == old_key[:2]):
+            cls.add(*new_key, 1)
+
+    @classmethod
+    def reconcile(cls, fix=True):
+        """
+        Compare every counter with the real application counts.
+        Returns a list of (semester_id, room_type, stored, actual) for counters
+        that drifted (stored is None when the counter was missing).
+        When fix is True, drifted counters are corrected.
+        """
+        actual = {}
+        rows = HostelApplication.objects.filter(status__in=cls.COUNTED_STATUSES).order_by().values(
+            'semester_id', 'room_type', 'status'
+        ).annotate(total=models.Count('id'))
+        for row in rows:
+            key = (row['semester_id'], row['room_type'])
+            actual.setdefault(key, {status: 0 for status in cls.COUNTED_STATUSES})[row['status']] = row['total']
+
+        drift = []
+        with transaction.atomic():
+            stored = {(u.semester_id, u.room_type): u for u in cls.objects.select_for_update()}
+            for key in set(actual) | set(stored):
+                real = actual.get(key, {status: 0 for status in cls.COUNTED_STATUSES})
+                usage = stored.get(key)
+                current = {status: getattr(usage, status) for status in cls.COUNTED_STATUSES} if usage else None
+                if current == real:
+                    continue
+                drift.append((key[0], key[1], current, real))
+                if fix:
+                    cls.objects.update_or_create(semester_id=key[0], room_type=key[1], defaults=real)
+        return drift
+
+class RoomQuerySet(models.QuerySet):
+    """Keeps Room.capacity in step with room_type in the bulk queries that skip save()"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for room in objs:
+            room.capacity = Room.capacity_for(room.room_type)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if isinstance(kwargs.get('room_type'), str):
+            kwargs['capacity'] = Room.capacity_for(kwargs['room_type'])
+        return super().update(**kwargs)
+
 # Model to store rooms in the hostel
 class Room(models.Model):
     # Room number (e.g., A101)
@@ -148,21 +433,64 @@ class Room(models.Model):
     ]
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='available')
 
+    # Number of students per room type
+    ROOM_CAPACITY = {
+        'single': 1,
+        'double': 2,
+    }
+
+    # Beds in the room. Worked out from room_type in save(); it is a column
+    # so free beds can be counted and filtered in the database
+    capacity = models.PositiveSmallIntegerField(default=1, editable=False)
+
+    objects = RoomQuerySet.as_manager()
+
     # Room features
     # (Fields removed as requested)
 
-    @property
-    def capacity(self):
-        if self.room_type == 'single':
-            return 1
-        elif self.room_type == 'double':
-            return 2
-        else:
-            return 1  # Default fallback
+    class Meta:
+        constraints = [
+            # Catches capacities that went out of step in raw SQL or
+            # bulk_update(), which RoomQuerySet doesn't cover
+            models.CheckConstraint(
+                check=(
+                    Q(room_type='double', capacity=2)
+                    | (~Q(room_type='double') & Q(capacity=1))
+                ),
+                name='room_capacity_matches_room_type',
+            ),
+        ]
 
     def __str__(self):
         return f"Room {self.room_number}"
 
+    @classmethod
+    def capacity_for(cls, room_type):
+        return cls.ROOM_CAPACITY.get(room_type, 1)  # Default fallback
+
+    # The fields free spot counts depend on, as last loaded or saved
+    # (None for new rooms)
+    _availability_inputs = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {'room_type', 'status'}:
+            instance._availability_inputs = instance.availability_inputs()
+        return instance
+
+    def availability_inputs(self):
+        """The fields that decide how many free spots the room adds (see availability.py)"""
+        return (self.room_type, self.status)
+
+    def save(self, *args, **kwargs):
+        self.capacity = self.capacity_for(self.room_type)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'room_type' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'capacity'}
+        super().save(*args, **kwargs)
+        self._availability_inputs = self.availability_inputs()
+
     def is_available(self):
         return self.status == 'available'
 
@@ -176,32 +504,33 @@ class Room(models.Model):
 
     def get_occupancy_count(self):
         # This method will now count all assignments that are not cancelled
+        # (list_rooms annotates the same count as occupancy_count)
+        if hasattr(self, 'occupancy_count'):
+            return self.occupancy_count
         return self.assignments.exclude(status='cancelled').count()
 
     def can_accommodate_more(self):
         return self.get_occupancy_count() < self.capacity
 
     def is_full_for_period(self, start_date, end_date):
-        # Debug print
-        print(f"DEBUG: Checking if room {self.room_number} is full for period {start_date} to {end_date}")
-        print(f"DEBUG: Room capacity: {self.capacity}")
-        
-        # Get overlapping assignments
-        overlapping = self.assignments.filter(
-            status='active',
-            start_date__lt=end_date,
-            end_date__gt=start_date
-        )
-        
-        # Debug print overlapping assignments
-        print(f"DEBUG: Found {overlapping.count()} overlapping assignments")
-        for assign in overlapping:
-            print(f"DEBUG: Assignment for {assign.student} from {assign.start_date} to {assign.end_date}")
-        
-        # Room is full if number of overlapping assignments equals or exceeds capacity
-        is_full = overlapping.count() >= self.capacity
-        print(f"DEBUG: Room is full: {is_full}")
-        
+        # Most beds booked on any night of the period, from the occupancy index
+        booked = RoomOccupancyDay.objects.filter(
+            room=self, date__gte=start_date, date__lt=end_date
+        ).aggregate(peak=Max('booked'))['peak'] or 0
+
+        # Room is full if every bed is booked on one of the nights
+        is_full = booked >= self.capacity
+
+        # Only list the overlapping assignments (an extra query) when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Room %s (capacity %s) has %s bed(s) booked on its busiest night from %s to %s, full: %s",
+                self.room_number, self.capacity, booked, start_date, end_date, is_full
+            )
+            overlapping = self.assignments.filter(status='active', start_date__lt=end_date, end_date__gt=start_date)
+            for assign in overlapping.select_related('student'):
+                logger.debug("Room %s: %s from %s to %s", self.room_number, assign.student, assign.start_date, assign.end_date)
+
         return is_full
 
     def update_status(self):
@@ -228,12 +557,12 @@ class Room(models.Model):
             if self.status != 'maintenance':  # Don't change if under maintenance
                 self.status = 'available'
                 self.save()
-                print(f"DEBUG: Room {self.room_number} status updated to available")
+                logger.debug("Room %s status updated to available", self.room_number)
         elif current_assignments >= self.capacity:
             # Room is at or over capacity with current assignments, mark as occupied
             self.status = 'occupied'
             self.save()
-            print(f"DEBUG: Room {self.room_number} status updated to occupied")
+            logger.debug("Room %s status updated to occupied", self.room_number)
         else:
             # Room has some current occupants but not full
             if self.room_type == 'single':
@@ -244,12 +573,97 @@ class Room(models.Model):
                 # Double rooms can be partially occupied but still available for more students
                 self.status = 'available'
                 self.save()
-            print(f"DEBUG: Room {self.room_number} status updated to {self.status}")
+            logger.debug("Room %s status updated to %s", self.room_number, self.status)
+
+    @classmethod
+    def status_expression(cls):
+        """
+        The status each room should have, worked out by the database from its
+        active assignments (the same rules as update_status()):
+        - nobody living there today: available, except rooms under maintenance
+          and occupied rooms that still have past or future active assignments,
+          which keep their status
+        - full today (or a single room with anyone in it): occupied
+        - a double room with one student today: available
+        """
+        today = timezone.now().date()
+        active = RoomAssignment.objects.filter(room=OuterRef('pk'), status='active')
+        current = active.filter(start_date__lte=today, end_date__gte=today)
+        current_count = Coalesce(
+            Subquery(
+                current.order_by().values('room').annotate(total=Count('id')).values('total'),
+                output_field=IntegerField()
+            ),
+            Value(0)
+        )
+        nobody_today = ~Exists(current)
+        return Case(
+            When(nobody_today & Q(Exists(active), status='occupied'), then=F('status')),
+            When(nobody_today & Q(status='maintenance'), then=F('status')),
+            When(nobody_today, then=Value('available')),
+            When(
+                GreaterThanOrEqual(current_count, F('capacity')),
+                then=Value('occupied')
+            ),
+            When(room_type='single', then=Value('occupied')),
+            default=Value('available'),
+            output_field=CharField(),
+        )
+
+    @classmethod
+    def update_statuses(cls, rooms=None):
+        """
+        Recompute the status of every room (or only the rooms in the `rooms`
+        queryset) with a single UPDATE. Returns how many rooms changed status.
+        """
+        rooms = cls.objects.all() if rooms is None else rooms
+        new_status = cls.status_expression()
+        changed = rooms.exclude(status=new_status).update(status=new_status)
+        logger.debug("Room statuses recomputed, %s changed", changed)
+        if changed:
+            # Only available rooms count towards the free spots
+            from .availability import invalidate_semester_availability
+            transaction.on_commit(invalidate_semester_availability)
+        return changed
+
+# Rooms whose status has to be recomputed when the current transaction
+# commits. Saving many assignments in one transaction then updates each
+# room once, at the end, instead of once per save.
+_rooms_to_update = threading.local()
+
+
+def update_room_status_on_commit(room_id):
+    """
+    Recompute a room's status once the current transaction commits
+    (straight away when there is no transaction)
+    """
+    pending = getattr(_rooms_to_update, 'room_ids', None)
+    if pending is None:
+        pending = _rooms_to_update.room_ids = set()
+    pending.add(room_id)
+    # Every call registers a callback (a rolled back transaction drops its
+    # callbacks); the first one to run takes all pending rooms
+    transaction.on_commit(_update_pending_room_statuses)
+
+
+def _update_pending_room_statuses():
+    room_ids = getattr(_rooms_to_update, 'room_ids', None)
+    if not room_ids:
+        return
+    _rooms_to_update.room_ids = set()
+    if len(room_ids) == 1:
+        # One room is cheaper to do in Python than to compile the bulk UPDATE
+        room = Room.objects.filter(pk=room_ids.pop()).first()
+        if room is not None:
+            room.update_status()
+    else:
+        Room.update_statuses(Room.objects.filter(id__in=room_ids))
 
 # Model to store room assignments
 class RoomAssignment(models.Model):
     # Link to the student
-    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='room_assignments')
+    # Indexed by the (student, status) index below
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='room_assignments', db_index=False)
 
     # Link to the room
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='assignments')
@@ -279,6 +693,19 @@ class RoomAssignment(models.Model):
     # Date and time when the assignment was created
     date_assigned = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Occupancy of a room over a period only looks at active stays
+            models.Index(
+                fields=['room', 'start_date', 'end_date'],
+                condition=models.Q(status='active'),
+                name='hostel_assign_active_stay',
+            ),
+            # Active stays that have ended, for check_expired_assignments
+            models.Index(fields=['end_date'], condition=models.Q(status='active'), name='hostel_assign_active_end'),
+            models.Index(fields=['student', 'status'], name='hostel_assign_student_status'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - Room {self.room.room_number}"
 
@@ -287,12 +714,63 @@ class RoomAssignment(models.Model):
 
     def can_be_cancelled(self):
         return self.status == 'active' and self.start_date > timezone.now().date()
-        
+
+    def calculate_payment_amount(self, semester):
+        """Total price for this assignment's stay, based on the semester room price"""
+        days = (self.end_date - self.start_date).days + 1
+        price_per_day = get_room_price(
+            self.student.student_type,
+            self.room.room_type,
+            semester.name
+        ) / 119  # Divide by default semester length to get price per day
+        return price_per_day * days
+
+    # What this assignment currently counts as in the occupancy index
+    # (set when the row is loaded from the database or saved)
+    _indexed_stay = None
+
+    # The fields the room status depends on, as last loaded or saved
+    # (None for new assignments)
+    _room_status_inputs = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {'room_id', 'start_date', 'end_date', 'status'}:
+            instance._indexed_stay = instance.occupancy_stay()
+            instance._room_status_inputs = instance.room_status_inputs()
+        return instance
+
+    def room_status_inputs(self):
+        """The fields that decide the status of the room (see Room.update_status)"""
+        return (self.room_id, self.start_date, self.end_date, self.status)
+
+    def occupancy_stay(self):
+        """
+        The (room id, start date, end date, active) this assignment takes up
+        in the occupancy index. Cancelled assignments don't take up any beds.
+        """
+        if self.status == 'cancelled':
+            return None
+        return (self.room_id, self.start_date, self.end_date, self.status == 'active')
+
     def save(self, *args, **kwargs):
-        """Override save method to update room status"""
-        super().save(*args, **kwargs)
-        # Update room status after saving
-        self.room.update_status()
+        """Override save method to update the occupancy index and room status"""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Move this stay in the occupancy index if the room, dates or status changed
+            new_stay = self.occupancy_stay()
+            RoomOccupancyDay.move_stay(self._indexed_stay, new_stay)
+            self._indexed_stay = new_stay
+
+            # Update room status when the transaction commits, but only if
+            # something it depends on changed (not e.g. payment_status)
+            old_inputs, new_inputs = self._room_status_inputs, self.room_status_inputs()
+            if old_inputs != new_inputs:
+                if old_inputs and old_inputs[0] != self.room_id:
+                    update_room_status_on_commit(old_inputs[0])
+                update_room_status_on_commit(self.room_id)
+                self._room_status_inputs = new_inputs
         
     def cancel_assignment(self):
         """Cancel this assignment and update room status"""
@@ -311,23 +789,249 @@ class RoomAssignment(models.Model):
         return False
     
     @classmethod
-    def check_expired_assignments(cls):
+    def check_expired_assignments(cls, batch_size=1000, dry_run=False, progress=None):
         """
         Check for expired assignments and mark them as completed.
         This should be called daily via a scheduled task.
+
+        Works in chunks of `batch_size` with one UPDATE each, then recomputes
+        the status of every affected room once. Completed stays keep their
+        days in the occupancy index but give back their booked nights.
+        Every run looks at all active stays that have ended, including ones
+        created or edited after the last run; completed stays drop out of
+        the partial index this reads, so that stays cheap.
+        With dry_run=True nothing is changed.
+        `progress(done, total)` is called after every chunk.
+        Returns the number of assignments (that would be) completed.
         """
         today = timezone.now().date()
-        expired_assignments = cls.objects.filter(
-            status='active',
-            end_date__lt=today
+        expired = cls.objects.filter(status='active', end_date__lt=today)
+        total = expired.count()
+
+        done = 0
+        last_id = 0
+        room_ids = set()
+        while True:
+            chunk = list(expired.filter(id__gt=last_id).order_by('id').values_list('id', 'room_id')[:batch_size])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            room_ids.update(room_id for _, room_id in chunk)
+            if dry_run:
+                done += len(chunk)
+            else:
+                with transaction.atomic():
+                    # status='active' again in case something changed since the SELECT
+                    ids = list(cls.objects.select_for_update().filter(
+                        id__in=[pk for pk, _ in chunk], status='active'
+                    ).values_list('id', flat=True))
+                    done += cls.objects.filter(id__in=ids).update(status='completed')
+                    RoomOccupancyDay.give_back_nights(cls.objects.filter(id__in=ids))
+            if progress:
+                progress(done, total)
+
+        if not dry_run:
+            if done:
+                # Completed stays no longer take up beds in the free spot counts
+                from .availability import invalidate_semester_availability
+                transaction.on_commit(invalidate_semester_availability)
+            room_ids = sorted(room_ids)
+            for start in range(0, len(room_ids), batch_size):
+                Room.update_statuses(Room.objects.filter(id__in=room_ids[start:start + batch_size]))
+        return done
+
+# Model to store how many beds of a room are taken on each day.
+# This is an index built from RoomAssignment so "is this room free between
+# two dates?" can be answered without scanning the assignments table.
+# `occupied` is for the occupancy reports: active and completed assignments
+# take up their days (start and end date included). `booked` is for the
+# free spot counts and follows the same rules as the assignment overlap
+# check: only active assignments, and only their nights (the end date is
+# the day they move out, so the next stay can start on it). Cancelled
+# assignments take up nothing.
+class RoomOccupancyDay(models.Model):
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='occupancy_days')
+    date = models.DateField()
+    occupied = models.PositiveIntegerField(default=0)
+    # Beds of active stays for the night starting on this day
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('room', 'date')
+
+    def __str__(self):
+        return f"Room {self.room_id} on {self.date}: {self.occupied}"
+
+    @staticmethod
+    def stay_dates(start_date, end_date):
+        """Every day of a stay, start and end date included"""
+        return [start_date + datetime.timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    @staticmethod
+    def _changes(end_date, active, beds):
+        """The UPDATE for a stay's days: every day is occupied, the nights of active stays are booked"""
+        changes = {'occupied': F('occupied') + beds}
+        if active:
+            changes['booked'] = Case(
+                When(date__lt=end_date, then=F('booked') + beds), default=F('booked'),
+                output_field=models.PositiveIntegerField(),
+            )
+        return changes
+
+    @classmethod
+    def add_stay(cls, room_id, start_date, end_date, active, beds=1):
+        """Add (or remove, with a negative number) beds for every day of a stay"""
+        days = cls.objects.filter(room_id=room_id, date__range=(start_date, end_date))
+        if beds > 0:
+            # Make sure there is a row for every day, then bump them all in one UPDATE
+            cls.objects.bulk_create(
+                [cls(room_id=room_id, date=day, occupied=0) for day in cls.stay_dates(start_date, end_date)],
+                ignore_conflicts=True
+            )
+            days.update(**cls._changes(end_date, active, beds))
+        else:
+            # Days that would drop to zero are removed to keep the table small
+            days.filter(occupied__lte=-beds).delete()
+            days.update(**cls._changes(end_date, active, beds))
+
+    @classmethod
+    def give_back_nights(cls, assignments):
+        """
+        Take the nights of `assignments` (a RoomAssignment queryset of stays
+        that were active) out of `booked` in one UPDATE, keeping their days,
+        e.g. when active stays are completed in bulk
+        """
+        nights = assignments.filter(
+            room=OuterRef('room'), start_date__lte=OuterRef('date'), end_date__gt=OuterRef('date')
+        ).order_by().values('room').annotate(total=Count('id')).values('total')
+        cls.objects.filter(Exists(nights)).update(
+            booked=F('booked') - Subquery(nights, output_field=models.PositiveIntegerField())
         )
-        
-        count = 0
-        for assignment in expired_assignments:
-            if assignment.mark_completed():
-                count += 1
-                
-        return count
+
+    @classmethod
+    def add_stays(cls, stays, batch_size=5000):
+        """
+        Add one bed per (room id, start date, end date, active) in `stays` in bulk.
+        Rooms that get the same number of beds for the same dates share one UPDATE.
+        """
+        beds_per_stay = {}
+        for stay in stays:
+            beds_per_stay[stay] = beds_per_stay.get(stay, 0) + 1
+
+        cls.objects.bulk_create(
+            [cls(room_id=room_id, date=day, occupied=0)
+             for room_id, start_date, end_date, _ in beds_per_stay
+             for day in cls.stay_dates(start_date, end_date)],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+
+        rooms_per_group = {}
+        for (room_id, start_date, end_date, active), beds in beds_per_stay.items():
+            rooms_per_group.setdefault((start_date, end_date, active, beds), []).append(room_id)
+        for (start_date, end_date, active, beds), room_ids in rooms_per_group.items():
+            cls.objects.filter(room_id__in=room_ids, date__range=(start_date, end_date)).update(
+                **cls._changes(end_date, active, beds)
+            )
+
+    @classmethod
+    def move_stay(cls, old_stay, new_stay):
+        """Move an assignment's beds from its old stay to its new stay"""
+        if old_stay == new_stay:
+            return
+        if old_stay:
+            cls.add_stay(*old_stay, beds=-1)
+        if new_stay:
+            cls.add_stay(*new_stay, beds=1)
+
+    @classmethod
+    def rebuild(cls, batch_size=5000):
+        """
+        Throw away the index and rebuild it from RoomAssignment.
+        Assignments are read room by room so memory stays small.
+        Returns the number of day rows written.
+        """
+        total = 0
+        with transaction.atomic():
+            cls.objects.all().delete()
+            stays = RoomAssignment.objects.exclude(status='cancelled').order_by('room_id').values_list(
+                'room_id', 'start_date', 'end_date', 'status'
+            )
+            current_room = None
+            counts = {}
+            for room_id, start_date, end_date, status in stays.iterator(chunk_size=batch_size):
+                if room_id != current_room:
+                    total += cls._write_counts(current_room, counts, batch_size)
+                    current_room = room_id
+                    counts = {}
+                for day in cls.stay_dates(start_date, end_date):
+                    occupied, booked = counts.get(day, (0, 0))
+                    counts[day] = (occupied + 1, booked + (status == 'active' and day < end_date))
+            total += cls._write_counts(current_room, counts, batch_size)
+        return total
+
+    @classmethod
+    def _write_counts(cls, room_id, counts, batch_size):
+        if room_id is None or not counts:
+            return 0
+        cls.objects.bulk_create(
+            [cls(room_id=room_id, date=day, occupied=occupied, booked=booked)
+             for day, (occupied, booked) in counts.items()],
+            batch_size=batch_size
+        )
+        return len(counts)
+
+# Daily rollups for reports (filled by `python manage.py update_daily_rollups`,
+# see rollups.py). Reports read these instead of aggregating the
+# applications and assignments tables every time.
+
+# Number of applications submitted on a day, per semester, room type,
+# status and student type
+class ApplicationDailyRollup(models.Model):
+    date = models.DateField()
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name='application_rollups')
+    room_type = models.CharField(max_length=10, choices=HostelApplication.ROOM_TYPE_CHOICES)
+    status = models.CharField(max_length=10, choices=HostelApplication.STATUS_CHOICES)
+    student_type = models.CharField(max_length=15, blank=True)
+    applications = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'semester', 'room_type', 'status', 'student_type')
+
+    def __str__(self):
+        return f"{self.date} {self.semester_id} {self.room_type} {self.status} {self.student_type}: {self.applications}"
+
+# Beds taken and total beds per room type on a day
+class OccupancyDailyRollup(models.Model):
+    date = models.DateField()
+    room_type = models.CharField(max_length=10, choices=Room.ROOM_TYPE_CHOICES)
+    occupied = models.PositiveIntegerField(default=0)
+    beds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'room_type')
+
+    def __str__(self):
+        return f"{self.date} {self.room_type}: {self.occupied}/{self.beds}"
+
+# Model to remember how far a scheduled job got (e.g. the last day
+# check_expired_assignments processed), so the next run can start from there
+class JobWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_date}"
+
+    @classmethod
+    def get_date(cls, name):
+        """The stored date for a job, or None if it never ran"""
+        return cls.objects.filter(name=name).values_list('last_date', flat=True).first()
+
+    @classmethod
+    def set_date(cls, name, last_date):
+        cls.objects.update_or_create(name=name, defaults={'last_date': last_date})
 
 # Model to store maintenance requests from students
 class MaintenanceRequest(models.Model):
@@ -383,6 +1087,12 @@ class MaintenanceRequest(models.Model):
     completed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='completed_maintenance_requests')
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Requests of a status, newest first
+            models.Index(fields=['status', 'date_submitted'], name='hostel_maint_status_date'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - {self.request_type}"
 
@@ -407,7 +1117,8 @@ class MaintenanceRequest(models.Model):
 # Model to store hostel fee payments
 class Payment(models.Model):
     # Link to the student
-    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payments')
+    # Indexed by the (student, status) index below
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payments', db_index=False)
 
     # Link to the room assignment
     room_assignment = models.ForeignKey(RoomAssignment, on_delete=models.CASCADE, related_name='payments')
@@ -440,6 +1151,11 @@ class Payment(models.Model):
     # Date and time when the payment was made
     date_paid = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'status'], name='hostel_payment_student_status'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - RM{self.amount}"
 
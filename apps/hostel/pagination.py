@@ -0,0 +1,96 @@
+import base64
+import datetime
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+# Keyset ("seek") pagination for the long staff lists.
+#
+# Instead of OFFSET, a page starts right after (or before) the sort key of
+# the last row the user saw, so every page costs the same however deep
+# into the list it is. The sort key must be unique (end it with 'id' if
+# the other fields aren't), and the cursor handed to the browser is that
+# key, JSON-encoded in URL-safe base64.
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Keeps the microseconds of datetimes, which DjangoJSONEncoder drops"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    data = json.dumps(list(values), cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """The key values in a cursor; raises ValueError if it isn't one of ours"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _key(obj, ordering):
+    values = []
+    for field in ordering:
+        value = obj
+        for name in field.lstrip('-').split('__'):
+            value = getattr(value, name)
+        values.append(value)
+    return values
+
+
+def _beyond(ordering, values, backwards=False):
+    """Rows that sort after the key `values` (before it when backwards)"""
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != backwards
+        equal = {previous.lstrip('-'): value for previous, value in zip(ordering[:i], values[:i])}
+        condition |= Q(**equal, **{f'{name}__{"lt" if descending else "gt"}': values[i]})
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, items, ordering, has_next, has_previous):
+        self.items = items
+        self.has_next = has_next and bool(items)
+        self.has_previous = has_previous and bool(items)
+        self.next_cursor = encode_cursor(_key(items[-1], ordering)) if self.has_next else None
+        self.previous_cursor = encode_cursor(_key(items[0], ordering)) if self.has_previous else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_paginate(queryset, ordering, after=None, before=None, per_page=50):
+    """
+    One page of `queryset` sorted by `ordering` (e.g. ['room_number'] or
+    ['-date_applied', '-id']): the first page, the page after the cursor
+    `after`, or the page before the cursor `before`. Runs one query.
+    Raises ValueError for a cursor that can't be decoded.
+    """
+    ordering = list(ordering)
+    if before:
+        backwards = ['-' + field if not field.startswith('-') else field[1:] for field in ordering]
+        rows = list(queryset.filter(
+            _beyond(ordering, decode_cursor(before, len(ordering)), backwards=True)
+        ).order_by(*backwards)[:per_page + 1])
+        items = rows[:per_page][::-1]
+        return KeysetPage(items, ordering, has_next=True, has_previous=len(rows) > per_page)
+
+    if after:
+        queryset = queryset.filter(_beyond(ordering, decode_cursor(after, len(ordering))))
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    return KeysetPage(rows[:per_page], ordering, has_next=len(rows) > per_page, has_previous=bool(after))
@@ -0,0 +1,98 @@
+import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Room, RoomAssignment, Semester, SemesterQuotaUsage
+from .rollups import application_counts
+
+# Numbers for the staff room statistics page. They are worked out with a
+# few conditional aggregates and kept in the cache as one snapshot, which is
+# dropped (see signals.py) whenever applications, assignments, rooms or
+# semesters change. Code that changes those tables with bulk queries
+# (bulk_create, update) must call invalidate_room_statistics() itself.
+
+ROOM_STATISTICS_CACHE_KEY = 'hostel:room_statistics'
+
+
+def invalidate_room_statistics():
+    """Drop the cached snapshot so the next page view recomputes it"""
+    cache.delete(ROOM_STATISTICS_CACHE_KEY)
+
+
+def get_room_statistics():
+    """The statistics snapshot, from the cache when it is still valid"""
+    today = timezone.now().date()
+    snapshot = cache.get(ROOM_STATISTICS_CACHE_KEY)
+    # Occupancy is "as of today", so a snapshot from yesterday is stale
+    if snapshot is None or snapshot['date'] != today:
+        snapshot = compute_room_statistics(today)
+        cache.set(ROOM_STATISTICS_CACHE_KEY, snapshot, settings.ROOM_STATISTICS_CACHE_SECONDS)
+    return snapshot
+
+
+def compute_room_statistics(today=None):
+    """Compute every number on the room statistics page (at most six queries)"""
+    today = today or timezone.now().date()
+
+    # Rooms by type
+    rooms = Room.objects.aggregate(
+        single=Count('id', filter=Q(room_type='single')),
+        double=Count('id', filter=Q(room_type='double')),
+    )
+
+    # Students living in a room today, by room type
+    occupancy = RoomAssignment.objects.filter(
+        status='active',
+        start_date__lte=today,
+        end_date__gte=today
+    ).aggregate(
+        single=Count('id', filter=Q(room__room_type='single')),
+        double=Count('id', filter=Q(room__room_type='double')),
+    )
+
+    # Applications by room type and month, from the daily rollup plus the
+    # days that weren't rolled up yet. Every application counts towards the
+    # room preference totals, only last year's towards the monthly charts.
+    applications, monthly_data = application_counts(today - datetime.timedelta(days=365))
+
+    # Quota use of the active semesters
+    semester_data = []
+    semesters = list(Semester.objects.filter(is_active=True).order_by('start_date', 'id'))
+    usage = SemesterQuotaUsage.counts_for_semesters(semester.id for semester in semesters)
+    for semester in semesters:
+        counts = {room_type: counts['approved'] for room_type, counts in usage[semester.id].items()}
+        semester_data.append({
+            'name': semester.name,
+            'quota_single': semester.quota_single,
+            'quota_double': semester.quota_double * 2,  # Convert to student capacity
+            'approved_single': counts['single'],
+            'approved_double': counts['double'],
+            'remaining_single_quota': max(0, semester.quota_single - counts['single']),
+            'remaining_double_quota': max(0, semester.quota_double * 2 - counts['double']),
+        })
+
+    total_single_capacity = rooms['single']
+    total_double_capacity = rooms['double'] * 2  # Each double room can accommodate 2 students
+
+    def occupancy_rate(occupied, capacity):
+        return round(occupied / capacity * 100) if capacity else 0
+
+    return {
+        'date': today,
+        'single_rooms': rooms['single'],
+        'double_rooms': rooms['double'],
+        'total_single_capacity': total_single_capacity,
+        'total_double_capacity': total_double_capacity,
+        'current_single_occupancy': occupancy['single'],
+        'current_double_occupancy': occupancy['double'],
+        'available_single': total_single_capacity - occupancy['single'],
+        'available_double': total_double_capacity - occupancy['double'],
+        'single_applications': applications['single'],
+        'double_applications': applications['double'],
+        'single_occupancy_rate': occupancy_rate(occupancy['single'], total_single_capacity),
+        'double_occupancy_rate': occupancy_rate(occupancy['double'], total_double_capacity),
+        'semester_data': semester_data,
+        'monthly_data': monthly_data,
+        'months': list(range(1, 13)),
+    }
@@ -0,0 +1,211 @@
+import datetime
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import ExtractMonth, TruncDate
+from django.utils import timezone
+from .models import (
+    ApplicationDailyRollup, HostelApplication, JobWatermark, OccupancyDailyRollup, Room, RoomOccupancyDay,
+)
+
+# Daily rollups of applications and occupancy for reports.
+#
+# `update_daily_rollups` rolls up every finished day (up to yesterday) and
+# stores the last rolled-up day as a watermark. Readers take the rolled-up
+# days from the rollup tables and only the days after the watermark from the
+# live tables, so the numbers are always complete but the cost stays flat as
+# history grows.
+#
+# Applications are counted with the status they have when their day is
+# rolled up. Each run re-rolls the last `window` days before the watermark
+# to pick up status changes of recent applications; `--backfill` re-rolls
+# everything.
+
+WATERMARK = 'daily_rollups'
+ROLLUP_BATCH_SIZE = 1000
+
+
+def rolled_up_through():
+    """The last day that is in the rollup tables, or None"""
+    return JobWatermark.get_date(WATERMARK)
+
+
+def rollup_applications(start_date, end_date):
+    """Replace the application rollup rows for start_date..end_date. Returns the number of rows written."""
+    rows = HostelApplication.objects.filter(
+        date_applied__date__range=(start_date, end_date)
+    ).order_by().annotate(day=TruncDate('date_applied')).values(
+        'day', 'semester_id', 'room_type', 'status', 'student__student_type'
+    ).annotate(total=Count('id'))
+
+    with transaction.atomic():
+        ApplicationDailyRollup.objects.filter(date__range=(start_date, end_date)).delete()
+        created = ApplicationDailyRollup.objects.bulk_create([
+            ApplicationDailyRollup(
+                date=row['day'],
+                semester_id=row['semester_id'],
+                room_type=row['room_type'],
+                status=row['status'],
+                student_type=row['student__student_type'] or '',
+                applications=row['total'],
+            ) for row in rows
+        ], batch_size=ROLLUP_BATCH_SIZE)
+    return len(created)
+
+
+def rollup_occupancy(start_date, end_date):
+    """
+    Replace the occupancy rollup rows for start_date..end_date, one per day
+    and room type, from the per-room occupancy index. Total beds are the
+    beds of the rooms that exist now. Returns the number of rows written.
+    """
+    beds = {room_type: 0 for room_type, _ in Room.ROOM_TYPE_CHOICES}
+    for row in Room.objects.order_by().values('room_type').annotate(total=Sum('capacity')):
+        beds[row['room_type']] = row['total']
+
+    occupied = {}
+    rows = RoomOccupancyDay.objects.filter(date__range=(start_date, end_date)).order_by().values(
+        'date', 'room__room_type'
+    ).annotate(total=Sum('occupied'))
+    for row in rows:
+        occupied[(row['date'], row['room__room_type'])] = row['total']
+
+    days = RoomOccupancyDay.stay_dates(start_date, end_date)
+    with transaction.atomic():
+        OccupancyDailyRollup.objects.filter(date__range=(start_date, end_date)).delete()
+        created = OccupancyDailyRollup.objects.bulk_create([
+            OccupancyDailyRollup(
+                date=day, room_type=room_type, occupied=occupied.get((day, room_type), 0), beds=beds[room_type]
+            ) for day in days for room_type in beds
+        ], batch_size=ROLLUP_BATCH_SIZE)
+    return len(created)
+
+
+def first_day_with_data():
+    """Earliest application or occupancy day, where a backfill starts"""
+    first_application = HostelApplication.objects.aggregate(first=Min('date_applied'))['first']
+    first_stay = RoomOccupancyDay.objects.aggregate(first=Min('date'))['first']
+    days = [day for day in (
+        timezone.localtime(first_application).date() if first_application else None, first_stay
+    ) if day]
+    return min(days) if days else None
+
+
+def update_daily_rollups(window=30, backfill=False, progress=None):
+    """
+    Roll up every finished day since the last run (plus `window` days before
+    it), or all history when backfill is True or nothing was rolled up yet.
+    Works a year at a time; `progress(start, end, application_rows, occupancy_rows)`
+    is called after each. Returns (start, end) of the rolled-up days, or None
+    when there was nothing to do.
+    """
+    end_date = timezone.now().date() - datetime.timedelta(days=1)
+    last_day = rolled_up_through()
+    if backfill or last_day is None:
+        start_date = first_day_with_data()
+    else:
+        start_date = last_day - datetime.timedelta(days=window) + datetime.timedelta(days=1)
+    if start_date is None or start_date > end_date:
+        return None
+
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(end_date, chunk_start + datetime.timedelta(days=364))
+        with transaction.atomic():
+            application_rows = rollup_applications(chunk_start, chunk_end)
+            occupancy_rows = rollup_occupancy(chunk_start, chunk_end)
+        if progress:
+            progress(chunk_start, chunk_end, application_rows, occupancy_rows)
+        chunk_start = chunk_end + datetime.timedelta(days=1)
+
+    JobWatermark.set_date(WATERMARK, max(end_date, last_day or end_date))
+    return start_date, end_date
+
+
+def application_counts(since_date):
+    """
+    Applications per room type: all of them, and per calendar month for
+    those submitted on or after since_date.
+    Returns ({'single': n, 'double': n}, {'single': [12 months], 'double': [...]})
+    """
+    totals = {room_type: 0 for room_type, _ in HostelApplication.ROOM_TYPE_CHOICES}
+    monthly = {room_type: [0] * 12 for room_type in totals}
+
+    def add(rows):
+        for row in rows:
+            totals[row['room_type']] += row['total']
+            monthly[row['room_type']][row['month'] - 1] += row['recent'] or 0
+
+    last_day = rolled_up_through()
+    live = HostelApplication.objects.all()
+    if last_day:
+        add(ApplicationDailyRollup.objects.filter(date__lte=last_day).order_by().annotate(
+            month=ExtractMonth('date')
+        ).values('room_type', 'month').annotate(
+            total=Sum('applications'),
+            recent=Sum('applications', filter=Q(date__gte=since_date)),
+        ))
+        live = live.filter(date_applied__date__gt=last_day)
+
+    add(live.order_by().annotate(
+        month=ExtractMonth('date_applied')
+    ).values('room_type', 'month').annotate(
+        total=Count('id'),
+        recent=Count('id', filter=Q(date_applied__date__gte=since_date)),
+    ))
+    return totals, monthly
+
+
+def occupancy_series(start_date, end_date, interval='day'):
+    """
+    Occupied and free beds per room type for every day (or week, starting on
+    Monday) from start_date to end_date, ready for a chart:
+    {'labels': ['2025-01-06', ...], 'single': {'occupied': [...], 'free': [...], 'beds': [...]}, 'double': {...}}
+
+    Rolled-up days come from the occupancy rollup; later days (today and
+    already-assigned future stays) from the per-room occupancy index.
+    A week shows its busiest day, so 'free' is what was free all week.
+    """
+    room_types = [room_type for room_type, _ in Room.ROOM_TYPE_CHOICES]
+    beds = {room_type: 0 for room_type in room_types}
+    for row in Room.objects.order_by().values('room_type').annotate(total=Sum('capacity')):
+        beds[row['room_type']] = row['total']
+    # Days without any rows are empty days with today's number of beds
+    days = {
+        (day, room_type): (0, beds[room_type])
+        for day in RoomOccupancyDay.stay_dates(start_date, end_date) for room_type in room_types
+    }
+
+    last_day = rolled_up_through()
+    live_start = start_date
+    if last_day and start_date <= last_day:
+        rolled = OccupancyDailyRollup.objects.filter(date__range=(start_date, min(end_date, last_day)))
+        for day, room_type, occupied, day_beds in rolled.values_list('date', 'room_type', 'occupied', 'beds'):
+            days[(day, room_type)] = (occupied, day_beds)
+        live_start = last_day + datetime.timedelta(days=1)
+
+    if live_start <= end_date:
+        rows = RoomOccupancyDay.objects.filter(date__range=(live_start, end_date)).order_by().values(
+            'date', 'room__room_type'
+        ).annotate(total=Sum('occupied'))
+        for row in rows:
+            days[(row['date'], row['room__room_type'])] = (row['total'], beds[row['room__room_type']])
+
+    # Group the days into the points of the series
+    points = {}
+    for (day, room_type), (occupied, beds) in days.items():
+        label = day - datetime.timedelta(days=day.weekday()) if interval == 'week' else day
+        point = points.setdefault(label, {room_type: (0, 0) for room_type in room_types})
+        busiest, _ = point[room_type]
+        if occupied >= busiest:
+            point[room_type] = (occupied, beds)
+
+    labels = sorted(points)
+    series = {'labels': [label.isoformat() for label in labels]}
+    for room_type in room_types:
+        values = [points[label][room_type] for label in labels]
+        series[room_type] = {
+            'occupied': [occupied for occupied, _ in values],
+            'free': [max(0, beds - occupied) for occupied, beds in values],
+            'beds': [beds for _, beds in values],
+        }
+    return series
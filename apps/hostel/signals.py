@@ -0,0 +1,104 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .availability import invalidate_semester_availability
+from .models import (
+    HostelApplication, Room, RoomAssignment, RoomOccupancyDay, Semester, SemesterQuotaUsage,
+    update_room_status_on_commit,
+)
+from .reports import invalidate_room_statistics
+
+
+@receiver(post_delete, sender=RoomAssignment)
+def remove_assignment_from_occupancy_index(sender, instance, **kwargs):
+    """
+    Signal handler that runs when a RoomAssignment is deleted
+    (also when it is deleted because its student or room was deleted)
+    and gives its beds back in the occupancy index. The room status is
+    recomputed when the transaction commits.
+    """
+    RoomOccupancyDay.move_stay(instance._indexed_stay, None)
+    update_room_status_on_commit(instance.room_id)
+
+
+@receiver(post_delete, sender=HostelApplication)
+def remove_application_from_quota_usage(sender, instance, **kwargs):
+    """
+    Signal handler that runs when a HostelApplication is deleted
+    and takes it out of the semester quota counters
+    """
+    SemesterQuotaUsage.move(instance._counted_as, None)
+
+
+@receiver(post_save, sender=HostelApplication)
+@receiver(post_delete, sender=HostelApplication)
+@receiver(post_delete, sender=RoomAssignment)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Semester)
+@receiver(post_delete, sender=Semester)
+def drop_room_statistics_snapshot(sender, **kwargs):
+    """
+    Signal handler that runs when anything shown on the room statistics
+    page changes, so the page is recomputed on its next visit. Waits for
+    the commit so the snapshot isn't rebuilt from the old rows meanwhile.
+    """
+    transaction.on_commit(invalidate_room_statistics)
+
+
+@receiver(post_save, sender=RoomAssignment)
+def drop_room_statistics_snapshot_for_assignment(sender, instance, created, **kwargs):
+    """
+    Same as above for saved assignments, except when only fields the
+    statistics don't use changed (e.g. payment_status)
+    """
+    if created or instance._room_status_inputs != instance.room_status_inputs():
+        transaction.on_commit(invalidate_room_statistics)
+
+
+@receiver(post_save, sender=HostelApplication)
+@receiver(post_delete, sender=HostelApplication)
+def drop_semester_availability_for_application(sender, instance, **kwargs):
+    """
+    Signal handler that drops the cached free spots of the application's
+    semester (and its old one) when it enters or leaves approved or pending,
+    which both hold a place in the quota
+    """
+    old_key = instance._counted_as
+    new_key = None if kwargs['signal'] is post_delete else instance.quota_key()
+    if old_key == new_key:
+        return
+    keys = [key for key in (old_key, new_key) if key]
+    if any(status in SemesterQuotaUsage.COUNTED_STATUSES for _, _, status in keys):
+        transaction.on_commit(partial(invalidate_semester_availability, [semester_id for semester_id, _, _ in keys]))
+
+
+@receiver(post_save, sender=RoomAssignment)
+@receiver(post_delete, sender=RoomAssignment)
+def drop_semester_availability_for_assignment(sender, instance, **kwargs):
+    """
+    Signal handler that drops every cached free spot count when a stay is
+    added, removed or moved, but not when e.g. only payment_status changed
+    """
+    if kwargs['signal'] is post_save and instance._room_status_inputs == instance.room_status_inputs():
+        return
+    transaction.on_commit(invalidate_semester_availability)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def drop_semester_availability_for_room(sender, instance, **kwargs):
+    """
+    Same for rooms that are added, removed, or change their type or status
+    """
+    if kwargs['signal'] is post_save and instance._availability_inputs == instance.availability_inputs():
+        return
+    transaction.on_commit(invalidate_semester_availability)
+
+
+@receiver(post_save, sender=Semester)
+@receiver(post_delete, sender=Semester)
+def drop_semester_availability_for_semester(sender, instance, **kwargs):
+    """Signal handler that drops a semester's cached free spots when its dates or quotas change"""
+    transaction.on_commit(partial(invalidate_semester_availability, [instance.id]))
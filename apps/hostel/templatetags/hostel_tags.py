@@ -43,5 +43,9 @@ def all_active_assignments(room):
     """
     Get all active assignments for a room regardless of date
     Usage: {{ room|all_active_assignments }}
+    Uses the list prefetched by list_rooms (active_assignment_list) when it's there,
+    so it doesn't run a query per room
     """
-    return room.assignments.filter(status='active') 
\ No newline at end of file
+    if hasattr(room, 'active_assignment_list'):
+        return room.active_assignment_list
+    return room.assignments.filter(status='active').select_related('student') 
\ No newline at end of file
@@ -21,7 +21,9 @@ urlpatterns = [
     path('semesters/add/', views.add_semester, name='add_semester'),
     path('semesters/edit/<int:semester_id>/', views.edit_semester, name='edit_semester'),
     path('semesters/delete/<int:semester_id>/', views.delete_semester, name='delete_semester'),
+    path('semesters/allocate-rooms/<int:semester_id>/', views.allocate_semester_rooms, name='allocate_semester_rooms'),
     path('applications/manage/<int:application_id>/', views.manage_application, name='manage_application'),
+    path('applications/bulk/', views.bulk_application_action, name='bulk_application_action'),
     path('applications/approve/<int:application_id>/', views.approve_application, name='approve_application'),
     path('applications/assign-room/<int:application_id>/', views.assign_room, name='assign_room'),
     path('my-room/', views.my_room, name='my_room'),
@@ -39,4 +41,10 @@ urlpatterns = [
     
     # Reports and statistics URLs
     path('statistics/rooms/', views.room_statistics, name='room_statistics'),
+    path('statistics/occupancy/', views.occupancy_series, name='occupancy_series'),
+
+    # Exports (CSV or JSON lines)
+    path('export/applications/', views.export_data, {'name': 'applications'}, name='export_applications'),
+    path('export/assignments/', views.export_data, {'name': 'assignments'}, name='export_assignments'),
+    path('export/payments/', views.export_data, {'name': 'payments'}, name='export_payments'),
 ] 
\ No newline at end of file
@@ -1,17 +1,40 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.conf import settings
 from django.utils import timezone
+from apps.accounts.models import User
 from .forms import HostelApplicationForm, MaintenanceRequestForm, RoomAssignmentForm, SemesterForm
-from .models import HostelApplication, MaintenanceRequest, Room, RoomAssignment, Semester, get_room_price, Payment
+from .models import (
+    HostelApplication, MaintenanceRequest, Room, RoomAssignment, Semester, SemesterQuotaUsage, get_room_price, Payment,
+)
+from .admission import (
+    admit_application, bulk_approve_applications, bulk_reject_applications, queue_application,
+    reconcile_auto_rejections,
+)
+from .allocation import allocate_rooms
+from .availability import free_capacity_by_room_type, get_semester_availability, rooms_with_free_beds
+from .exports import (
+    EXPORTS, FORMATS, application_filters, export_chunks, export_filename, filter_applications, filter_payments,
+    filter_rooms, listed_payments, payment_filters, room_filters,
+)
+from .pagination import keyset_paginate
+from .reports import get_room_statistics
+from .rollups import occupancy_series as get_occupancy_series
+from .waitlist import promote_from_waitlist, waitlist_position
 from django import forms
 from datetime import date
 from django.forms import modelform_factory
 import datetime
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, QueryDict, StreamingHttpResponse
+from django.urls import reverse
 import json
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from collections import defaultdict
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
@@ -25,7 +48,7 @@ def apply_for_hostel(request):
     # Check if user already has a pending/approved application
     existing_application = HostelApplication.objects.filter(
         student=request.user,
-        status__in=['pending', 'approved']
+        status__in=HostelApplication.ACTIVE_STATUSES
     ).order_by('-date_applied').first()
 
     if request.method == 'POST':
@@ -34,61 +57,17 @@ def apply_for_hostel(request):
             application = form.save(commit=False)
             application.student = request.user
             
-            # Check if auto-rejection is needed before saving
-            semester = application.semester
-            room_type = application.room_type
-            
-            # Count approved applications for this semester and room type
-            approved_single = HostelApplication.objects.filter(semester=semester, room_type='single', status='approved').count()
-            approved_double = HostelApplication.objects.filter(semester=semester, room_type='double', status='approved').count()
-            quota_single = semester.quota_single
-            quota_double = semester.quota_double * 2  # double room quota is number of students
-            
-            # Calculate remaining quota
-            remaining_single = max(0, quota_single - approved_single)
-            remaining_double = max(0, quota_double - approved_double)
-            
-            # Check for available rooms
-            available_single_rooms = 0
-            available_double_rooms = 0
-            
-            single_rooms = Room.objects.filter(room_type='single', status='available')
-            for room in single_rooms:
-                if not room.is_full_for_period(application.start_date, application.end_date):
-                    available_single_rooms += 1
-                    
-            double_rooms = Room.objects.filter(room_type='double', status='available')
-            for room in double_rooms:
-                if not room.is_full_for_period(application.start_date, application.end_date):
-                    # Count available spots in double rooms (could be 1 or 2 per room)
-                    capacity = room.capacity
-                    current_occupants = room.get_occupancy_count()
-                    available_spots = capacity - current_occupants
-                    available_double_rooms += available_spots
-            
-            # Save the application
-            application.save()
-            
-            # Check if auto-rejection is needed
-            auto_rejected = False
-            if room_type == 'single' and (remaining_single <= 0 or available_single_rooms <= 0):
-                application.status = 'rejected'
-                application.rejection_reason = 'Auto-rejected: No quota or rooms available for single rooms.'
-                application.is_auto_rejected = True
-                application.save()
-                auto_rejected = True
-                messages.warning(request, 'Your application has been automatically rejected due to no quota or rooms available for single rooms.')
-            elif room_type == 'double' and (remaining_double <= 0 or available_double_rooms <= 0):
-                application.status = 'rejected'
-                application.rejection_reason = 'Auto-rejected: No quota or rooms available for double rooms.'
-                application.is_auto_rejected = True
-                application.save()
-                auto_rejected = True
-                messages.warning(request, 'Your application has been automatically rejected due to no quota or rooms available for double rooms.')
-            
-            if not auto_rejected:
+            if settings.HOSTEL_QUEUED_INTAKE:
+                # Just record the application, the queue worker decides on it later
+                queue_application(application)
+                messages.success(request, 'Your hostel application has been received and is queued for processing.')
+            # Save the application first-come-first-serve: it stays pending if
+            # there is quota and a free room left, otherwise it is auto-rejected
+            elif admit_application(application):
                 messages.success(request, 'Your hostel application has been submitted successfully!')
-                
+            else:
+                messages.warning(request, f'Your application has been automatically rejected due to no quota or rooms available for {application.room_type} rooms.')
+
             return redirect('hostel:my_application')
     else:
         form = HostelApplicationForm(user=request.user)
@@ -100,11 +79,14 @@ def apply_for_hostel(request):
         application_start__lte=now,
         application_end__gte=now
     )
+    # Spots left per room type, from the cached summaries (see availability.py)
+    availability = get_semester_availability(active_semesters)
     semester_data = {
         str(semester.id): {
             'start_date': semester.start_date.isoformat(),
             'end_date': semester.end_date.isoformat(),
-            'name': semester.name
+            'name': semester.name,
+            'spots': {room_type: summary['spots'] for room_type, summary in availability[semester.id].items()},
         } for semester in active_semesters
     }
 
@@ -125,52 +107,6 @@ def my_hostel_application(request):
     application = HostelApplication.objects.filter(student=request.user).order_by('-date_applied').first()
     semester_name = application.semester.name if application else None
     
-    # Auto-rejection check for pending applications
-    if application and application.status == 'pending':
-        semester = application.semester
-        # Count approved applications for this semester and room type
-        approved_single = HostelApplication.objects.filter(semester=semester, room_type='single', status='approved').count()
-        approved_double = HostelApplication.objects.filter(semester=semester, room_type='double', status='approved').count()
-        quota_single = semester.quota_single
-        quota_double = semester.quota_double * 2  # double room quota is number of students
-        
-        # Calculate remaining quota
-        remaining_single = max(0, quota_single - approved_single)
-        remaining_double = max(0, quota_double - approved_double)
-        
-        # Check for available rooms
-        from .models import Room
-        available_single_rooms = 0
-        available_double_rooms = 0
-        
-        single_rooms = Room.objects.filter(room_type='single', status='available')
-        for room in single_rooms:
-            if not room.is_full_for_period(application.start_date, application.end_date):
-                available_single_rooms += 1
-                
-        double_rooms = Room.objects.filter(room_type='double', status='available')
-        for room in double_rooms:
-            if not room.is_full_for_period(application.start_date, application.end_date):
-                # Count available spots in double rooms (could be 1 or 2 per room)
-                capacity = room.capacity
-                current_occupants = room.get_occupancy_count()
-                available_spots = capacity - current_occupants
-                available_double_rooms += available_spots
-        
-        # Auto-reject if no quota or rooms available
-        if application.room_type == 'single' and (remaining_single <= 0 or available_single_rooms <= 0):
-            application.status = 'rejected'
-            application.rejection_reason = 'Auto-rejected: No quota or rooms available for single rooms.'
-            application.is_auto_rejected = True
-            application.save()
-            messages.warning(request, 'Your application has been automatically rejected due to no quota or rooms available for single rooms.')
-        elif application.room_type == 'double' and (remaining_double <= 0 or available_double_rooms <= 0):
-            application.status = 'rejected'
-            application.rejection_reason = 'Auto-rejected: No quota or rooms available for double rooms.'
-            application.is_auto_rejected = True
-            application.save()
-            messages.warning(request, 'Your application has been automatically rejected due to no quota or rooms available for double rooms.')
-    
     # Check if application period is still open for reapplication
     can_apply_again = False
     active_application_period = False
@@ -189,7 +125,7 @@ def my_hostel_application(request):
         # Check if the student has any other pending or approved applications
         has_other_active_application = HostelApplication.objects.filter(
             student=request.user,
-            status__in=['pending', 'approved']
+            status__in=HostelApplication.ACTIVE_STATUSES
         ).exclude(id=application.id).exists()
         
         # A student can apply again if the application period is active and they don't have other active applications
@@ -198,6 +134,7 @@ def my_hostel_application(request):
     context = {
         'application': application, 
         'semester_name': semester_name,
+        'waitlist_position': waitlist_position(application) if application else None,
         'can_apply_again': can_apply_again,
         'active_application_period': active_application_period,
         'has_other_active_application': has_other_active_application
@@ -309,7 +246,7 @@ def all_maintenance_requests(request):
     trimester = request.GET.get('trimester')
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
-    requests = MaintenanceRequest.objects.all()
+    requests = MaintenanceRequest.objects.select_related('student', 'assigned_to')
     if trimester:
         assignments = RoomAssignment.objects.filter(hostel_application__semester_id=trimester)
         room_numbers = assignments.values_list('room__room_number', flat=True)
@@ -353,9 +290,19 @@ def manage_maintenance_request(request, request_id):
 def manage_application(request, application_id):
     application = get_object_or_404(HostelApplication, id=application_id)
     semester = application.semester
-    # Count approved applications for this semester and room type
-    approved_single = HostelApplication.objects.filter(semester=semester, room_type='single', status='approved').count()
-    approved_double = HostelApplication.objects.filter(semester=semester, room_type='double', status='approved').count()
+    if request.method == 'GET' and (application.start_date, application.end_date) == (semester.start_date, semester.end_date):
+        # Only showing the page: the semester's cached summary has the numbers
+        availability = get_semester_availability([semester])[semester.id]
+        approved_counts = {room_type: summary['approved'] for room_type, summary in availability.items()}
+        free_capacity = {room_type: summary['free_beds'] for room_type, summary in availability.items()}
+    else:
+        # Approving or rejecting (or a stay that isn't the whole semester): check the database.
+        # Approved applications for this semester and room type (from the quota counters)
+        approved_counts = semester.get_approved_counts()
+        # Check for available rooms (free spots per room type, one query)
+        free_capacity = free_capacity_by_room_type(application.start_date, application.end_date)
+    approved_single = approved_counts['single']
+    approved_double = approved_counts['double']
     quota_single = semester.quota_single
     quota_double = semester.quota_double * 2  # double room quota is number of students
     
@@ -363,31 +310,15 @@ def manage_application(request, application_id):
     remaining_single = max(0, quota_single - approved_single)
     remaining_double = max(0, quota_double - approved_double)
     
-    # Check for available rooms
-    from .models import Room
-    available_single_rooms = 0
-    available_double_rooms = 0
-    
-    single_rooms = Room.objects.filter(room_type='single', status='available')
-    for room in single_rooms:
-        if not room.is_full_for_period(application.start_date, application.end_date):
-            available_single_rooms += 1
-            
-    double_rooms = Room.objects.filter(room_type='double', status='available')
-    for room in double_rooms:
-        if not room.is_full_for_period(application.start_date, application.end_date):
-            # Count available spots in double rooms (could be 1 or 2 per room)
-            capacity = room.capacity
-            current_occupants = room.get_occupancy_count()
-            available_spots = capacity - current_occupants
-            available_double_rooms += available_spots
+    available_single_rooms = free_capacity['single']
+    available_double_rooms = free_capacity['double']
     
     # Debug information
-    print(f"DEBUG: Application ID: {application.id}, Room Type: {application.room_type}")
-    print(f"DEBUG: Quota - Single: {quota_single}, Double: {quota_double}")
-    print(f"DEBUG: Approved - Single: {approved_single}, Double: {approved_double}")
-    print(f"DEBUG: Remaining - Single: {remaining_single}, Double: {remaining_double}")
-    print(f"DEBUG: Available Rooms - Single: {available_single_rooms}, Double: {available_double_rooms}")
+    logger.debug(
+        "Application %s (%s): quota %s/%s, approved %s/%s, remaining %s/%s, available spots %s/%s (single/double)",
+        application.id, application.room_type, quota_single, quota_double, approved_single, approved_double,
+        remaining_single, remaining_double, available_single_rooms, available_double_rooms
+    )
     
     # Check if this specific application can be approved based on room type
     can_approve = True
@@ -397,22 +328,18 @@ def manage_application(request, application_id):
         if remaining_single <= 0:
             can_approve = False
             approval_blocked_reason = "Quota for single rooms has been reached."
-            print(f"DEBUG: Can't approve - No quota for single rooms")
         elif available_single_rooms <= 0:
             can_approve = False
             approval_blocked_reason = "No available single rooms for the requested period."
-            print(f"DEBUG: Can't approve - No available single rooms")
     else:  # double room
         if remaining_double <= 0:
             can_approve = False
             approval_blocked_reason = "Quota for double rooms has been reached."
-            print(f"DEBUG: Can't approve - No quota for double rooms")
         elif available_double_rooms <= 0:
             can_approve = False
             approval_blocked_reason = "No available spots in double rooms for the requested period."
-            print(f"DEBUG: Can't approve - No available double rooms")
     
-    print(f"DEBUG: Final can_approve: {can_approve}, Reason: {approval_blocked_reason if not can_approve else 'N/A'}")
+    logger.debug("Application %s can_approve: %s, reason: %s", application.id, can_approve, approval_blocked_reason or 'N/A')
     
     # Check if the application has a room assignment
     has_assignment = False
@@ -431,17 +358,7 @@ def manage_application(request, application_id):
                 return redirect('hostel:manage_application', application_id=application.id)
             
             # Check for available room of requested type and period
-            from .models import Room
-            available_rooms = Room.objects.filter(
-                room_type=application.room_type,
-                status='available'
-            )
-            available = False
-            for room in available_rooms:
-                if not room.is_full_for_period(application.start_date, application.end_date):
-                    available = True
-                    break
-            if not available:
+            if free_capacity[application.room_type] <= 0:
                 application.status = 'rejected'
                 application.rejection_reason = 'No available room for requested type'
                 application.is_auto_rejected = True
@@ -467,19 +384,13 @@ def manage_application(request, application_id):
                 application.rejection_reason = ''
                 application.save()
                 messages.success(request, 'Application approved successfully!')
-                # After approval, check if quota is now full and auto-reject remaining pending
-                if application.room_type == 'single' and approved_single + 1 >= quota_single:
-                    HostelApplication.objects.filter(
-                        semester=semester, room_type='single', status='pending'
-                    ).update(status='rejected', rejection_reason='Quota reached', is_auto_rejected=True)
-                if application.room_type == 'double' and approved_double + 1 >= quota_double:
-                    HostelApplication.objects.filter(
-                        semester=semester, room_type='double', status='pending'
-                    ).update(status='rejected', rejection_reason='Quota reached', is_auto_rejected=True)
+                # After approval, auto-reject pending applications that can no longer be approved
+                reconcile_auto_rejections([semester])
                 return redirect('hostel:all_applications')
         elif action == 'reject' and application.can_be_rejected():
             # If this was an approved application, we need to free up quota
             was_approved = application.status == 'approved'
+            held_quota = application.status in SemesterQuotaUsage.COUNTED_STATUSES
             
             # If the application was approved and has a room assignment, release the room
             if was_approved and hasattr(application, 'room_assignment') and application.room_assignment:
@@ -494,27 +405,16 @@ def manage_application(request, application_id):
                 room_assignment.save()
                 
                 # Log the action
-                print(f"DEBUG: Room {room_assignment.room.room_number} released after application {application.id} was rejected")
+                logger.info("Room %s released after application %s was rejected", room_assignment.room.room_number, application.id)
             
             application.reject()
             application.rejection_reason = request.POST.get('rejection_reason', 'Rejected by staff')
             application.save()
             messages.success(request, 'Application rejected successfully!')
             
-            # If this was previously approved, try to reinstate oldest auto-rejected
-            if was_approved:
-                # Find oldest auto-rejected for this room type
-                quota = quota_single if application.room_type == 'single' else quota_double
-                approved_count = HostelApplication.objects.filter(semester=semester, room_type=application.room_type, status='approved').count()
-                if approved_count < quota:
-                    reinstates = HostelApplication.objects.filter(
-                        semester=semester, room_type=application.room_type, status='rejected', is_auto_rejected=True
-                    ).order_by('date_applied')[:quota - approved_count]
-                    for app in reinstates:
-                        app.status = 'pending'
-                        app.is_auto_rejected = False
-                        app.rejection_reason = ''
-                        app.save()
+            # Its place in the quota goes to the first ones on the waitlist
+            if held_quota:
+                promote_from_waitlist(semester, application.room_type)
         else:
             messages.error(request, 'Invalid action or application cannot be updated.')
         return redirect('hostel:all_applications')
@@ -537,61 +437,106 @@ def manage_application(request, application_id):
     
     return render(request, 'hostel/manage_application.html', context)
 
+APPLICATIONS_PER_PAGE = 50
+MAX_APPLICATIONS_PER_PAGE = 200
+
 @login_required
 @user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
 def all_applications(request):
-    semester_id = request.GET.get('semester')
-    applications = HostelApplication.objects.all().order_by('date_applied')
-    if semester_id:
-        applications = applications.filter(semester_id=semester_id)
+    """
+    Applications oldest first, a page at a time, filtered in SQL by
+    ?semester=, ?status=, ?room_type= and ?student_type=. Pages are
+    keyset-paginated on (date_applied, id) with ?after= / ?before=
+    cursors, so every page takes the same few queries.
+    """
+    filters = application_filters(request.GET)
+    per_page = _int_param(request, 'per_page', APPLICATIONS_PER_PAGE, minimum=1, maximum=MAX_APPLICATIONS_PER_PAGE)
+
+    # Student, semester and room assignment come with each application
+    applications = filter_applications(
+        HostelApplication.objects.select_related('student', 'semester', 'room_assignment'), filters
+    )
     semesters = Semester.objects.all().order_by('-id')
-    
-    # Auto-reject applications when quota is reached or no rooms available
-    pending_applications = applications.filter(status='pending')
-    for semester in Semester.objects.filter(id__in=pending_applications.values_list('semester', flat=True).distinct()):
-        # Check quotas for this semester
-        approved_single = HostelApplication.objects.filter(semester=semester, room_type='single', status='approved').count()
-        approved_double = HostelApplication.objects.filter(semester=semester, room_type='double', status='approved').count()
-        quota_single = semester.quota_single
-        quota_double = semester.quota_double * 2  # double room quota is number of students
-        
-        # Auto-reject if quota reached
-        if approved_single >= quota_single:
-            HostelApplication.objects.filter(
-                semester=semester, room_type='single', status='pending'
-            ).update(status='rejected', rejection_reason='Quota reached', is_auto_rejected=True)
-            
-        if approved_double >= quota_double:
-            HostelApplication.objects.filter(
-                semester=semester, room_type='double', status='pending'
-            ).update(status='rejected', rejection_reason='Quota reached', is_auto_rejected=True)
-    
-    # Refresh applications list after auto-rejections
-    applications = HostelApplication.objects.all().order_by('date_applied')
-    if semester_id:
-        applications = applications.filter(semester_id=semester_id)
-    
-    app_list = []
-    for app in applications:
-        has_assignment = False
-        if app.status == 'approved':
-            # Check if this specific application has a room assignment
-            try:
-                has_assignment = hasattr(app, 'room_assignment') and app.room_assignment is not None
-            except:
-                # Fallback to checking if there's any assignment linked to this application
-                has_assignment = RoomAssignment.objects.filter(hostel_application=app).exists()
-        app_list.append({
-            'app': app,
-            'has_assignment': has_assignment,
-        })
+
+    ordering = ['date_applied', 'id']
+    try:
+        page = keyset_paginate(
+            applications, ordering,
+            after=request.GET.get('after'), before=request.GET.get('before'), per_page=per_page
+        )
+    except ValueError:
+        page = keyset_paginate(applications, ordering, per_page=per_page)
+
+    # This page only reads; pending applications that can no longer be approved
+    # are auto-rejected by reconcile_auto_rejections() when quota-affecting changes happen
+    app_list = [{
+        'app': app,
+        # select_related already knows whether there is an assignment
+        'has_assignment': app.status == 'approved' and hasattr(app, 'room_assignment'),
+    } for app in page]
     return render(request, 'hostel/all_applications.html', {
         'applications': app_list,
         'user': request.user,
         'semesters': semesters,
-        'selected_semester': int(semester_id) if semester_id else None
+        'selected_semester': filters['semester'],
+        'filters': filters,
+        'statuses': HostelApplication.STATUS_CHOICES,
+        'room_types': HostelApplication.ROOM_TYPE_CHOICES,
+        'student_types': User.STUDENT_TYPE_CHOICES,
+        'per_page': per_page,
+        'next_url': _page_url(request, after=page.next_cursor, before=None) if page.has_next else None,
+        'previous_url': _page_url(request, before=page.previous_cursor, after=None) if page.has_previous else None,
     })
 
+@login_required
+@user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
+def bulk_application_action(request):
+    """
+    Approve or reject many pending applications at once (POST only):
+    - action=approve / action=reject with the selected application_ids
+    - action=approve_oldest with per_group=N approves the oldest N pending
+      applications per semester and room type that match the list filters
+    Approvals check quota and free beds once for all of them, and the
+    applications that don't fit are auto-rejected.
+    """
+    query = request.POST.get('query', '')
+    back = reverse('hostel:all_applications') + (f'?{query}' if query else '')
+    if request.method != 'POST':
+        return redirect(back)
+
+    action = request.POST.get('action')
+    if action == 'approve_oldest':
+        try:
+            per_group = int(request.POST.get('per_group', ''))
+        except ValueError:
+            per_group = 0
+        if per_group < 1:
+            messages.error(request, 'Enter how many applications to approve per semester and room type.')
+            return redirect(back)
+        applications = filter_applications(HostelApplication.objects.all(), application_filters(QueryDict(query)))
+    elif action in ('approve', 'reject'):
+        ids = [value for value in request.POST.getlist('application_ids') if value.isdigit()]
+        if not ids:
+            messages.error(request, 'Select at least one application.')
+            return redirect(back)
+        applications = HostelApplication.objects.filter(id__in=ids)
+        per_group = None
+    else:
+        messages.error(request, 'Unknown action.')
+        return redirect(back)
+
+    if action == 'reject':
+        rejected = bulk_reject_applications(
+            applications, reason=request.POST.get('rejection_reason') or 'Rejected by staff'
+        )
+        messages.success(request, f'{rejected} application(s) rejected.')
+    else:
+        approved, rejected = bulk_approve_applications(applications, per_group=per_group)
+        messages.success(request, f'{approved} application(s) approved.')
+        if rejected:
+            messages.warning(request, f'{rejected} application(s) auto-rejected: no quota or rooms left for them.')
+    return redirect(back)
+
 # Staff: List all semesters
 @login_required
 @user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
@@ -660,6 +605,8 @@ def edit_semester(request, semester_id):
             semester.application_end = timezone.make_aware(naive_datetime)
             
             semester.save()
+            # Quotas may have changed, so re-check pending applications
+            reconcile_auto_rejections([semester])
             messages.success(request, 'Semester updated successfully!')
             return redirect('hostel:list_semesters')
     else:
@@ -683,6 +630,28 @@ def delete_semester(request, semester_id):
             return redirect('hostel:list_semesters')
     return render(request, 'hostel/semester_confirm_delete.html', {'semester': semester, 'has_applications': has_applications})
 
+@login_required
+@user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
+def allocate_semester_rooms(request, semester_id):
+    """Assign rooms to every approved application of a semester in one go"""
+    semester = get_object_or_404(Semester, id=semester_id)
+    if request.method != 'POST':
+        messages.error(request, 'Invalid request method.')
+        return redirect('hostel:list_semesters')
+
+    result = allocate_rooms(semester)
+    # Fewer free rooms now, so re-check pending applications
+    reconcile_auto_rejections([semester])
+    assigned = sum(result['assigned'].values())
+    unassigned = sum(result['unassigned'].values())
+    if assigned:
+        messages.success(request, f'Assigned rooms to {assigned} approved application(s) for {semester.name}.')
+    else:
+        messages.info(request, f'No approved applications for {semester.name} are waiting for a room.')
+    if unassigned:
+        messages.warning(request, f'{unassigned} approved application(s) could not be given a room because no rooms are free.')
+    return redirect('hostel:list_semesters')
+
 @login_required
 @user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
 def assign_room(request, application_id):
@@ -720,13 +689,7 @@ def assign_room(request, application_id):
 
             # Create a payment record for the assignment
             # Recalculate price based on actual assignment duration
-            days = (assignment.end_date - assignment.start_date).days + 1
-            price_per_day = get_room_price(
-                 assignment.student.student_type,
-                 assignment.room.room_type,
-                 assignment.hostel_application.semester.name # Use semester from linked application
-            ) / 119 # Divide by default semester length to get price per day
-            total_price = price_per_day * days
+            total_price = assignment.calculate_payment_amount(application.semester)
 
             Payment.objects.create(
                 student=assignment.student,
@@ -744,6 +707,8 @@ def assign_room(request, application_id):
             else:
                 assignment.room.status = 'available'
             assignment.room.save()
+            # One less free room, so re-check pending applications
+            reconcile_auto_rejections([application.semester])
             messages.success(request, f'Room {assignment.room.room_number} assigned to {application.student.get_full_name()} successfully!')
             return redirect('hostel:all_applications')
         else:
@@ -796,11 +761,100 @@ def delete_application(request, application_id):
         return redirect('hostel:all_applications')
     return render(request, 'hostel/application_confirm_delete.html', {'application': application})
 
+ROOMS_PER_PAGE = 50
+MAX_ROOMS_PER_PAGE = 200
+
+def _int_param(request, name, default=None, minimum=0, maximum=None):
+    """A whole-number GET parameter, or `default` when it's missing or not a number"""
+    try:
+        value = max(minimum, int(request.GET[name]))
+    except (KeyError, ValueError):
+        return default
+    return min(value, maximum) if maximum is not None else value
+
+def _page_url(request, **params):
+    """The current URL with some GET parameters replaced (None removes them)"""
+    query = request.GET.copy()
+    for name, value in params.items():
+        query.pop(name, None)
+        if value is not None:
+            query[name] = value
+    return f'{request.path}?{query.urlencode()}'
+
 @login_required
 @user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
 def list_rooms(request):
-    rooms = Room.objects.all().order_by('room_number')
-    return render(request, 'hostel/rooms_list.html', {'rooms': rooms})
+    """
+    Rooms by room number, a page at a time, filtered by ?room_type=,
+    ?status=, ?block= (room number prefix) and ?min_free_beds=.
+    Pages are keyset-paginated with ?after= / ?before= cursors, so a page
+    costs the same wherever it is. ?format=json returns the same page as
+    JSON without the assigned students.
+    """
+    today = timezone.now().date()
+    filters = room_filters(request.GET)
+    per_page = _int_param(request, 'per_page', ROOMS_PER_PAGE, minimum=1, maximum=MAX_ROOMS_PER_PAGE)
+    as_json = request.GET.get('format') == 'json'
+
+    # Counted per room with subqueries rather than a join and GROUP BY, so
+    # only the rooms on the page are counted. Free beds are the beds not
+    # taken by a current or upcoming stay.
+    occupancy_count = Coalesce(Subquery(
+        RoomAssignment.objects.filter(room=OuterRef('pk')).exclude(status='cancelled').order_by().values(
+            'room'
+        ).annotate(total=Count('id')).values('total')
+    ), Value(0))
+    rooms = filter_rooms(rooms_with_free_beds(today).annotate(occupancy_count=occupancy_count), filters)
+
+    if not as_json:
+        # The active assignments (with their students) of the rooms on the page
+        rooms = rooms.prefetch_related(
+            Prefetch(
+                'assignments',
+                queryset=RoomAssignment.objects.filter(status='active').select_related('student').order_by('start_date', 'id'),
+                to_attr='active_assignment_list'
+            )
+        )
+
+    try:
+        page = keyset_paginate(
+            rooms, ['room_number'],
+            after=request.GET.get('after'), before=request.GET.get('before'), per_page=per_page
+        )
+    except ValueError:
+        if as_json:
+            return JsonResponse({'error': 'Invalid page cursor'}, status=400)
+        page = keyset_paginate(rooms, ['room_number'], per_page=per_page)
+
+    next_url = _page_url(request, after=page.next_cursor, before=None) if page.has_next else None
+    previous_url = _page_url(request, before=page.previous_cursor, after=None) if page.has_previous else None
+
+    if as_json:
+        return JsonResponse({
+            'rooms': [{
+                'id': room.id,
+                'room_number': room.room_number,
+                'room_type': room.room_type,
+                'status': room.status,
+                'capacity': room.capacity,
+                'occupancy_count': room.occupancy_count,
+                'free_beds': room.free_beds,
+            } for room in page],
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+            'next': next_url,
+            'previous': previous_url,
+        })
+
+    return render(request, 'hostel/rooms_list.html', {
+        'rooms': page.items,
+        'filters': filters,
+        'room_types': Room.ROOM_TYPE_CHOICES,
+        'statuses': Room.STATUS_CHOICES,
+        'per_page': per_page,
+        'next_url': next_url,
+        'previous_url': previous_url,
+    })
 
 @login_required
 @user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
@@ -879,9 +933,10 @@ def approve_application(request, application_id):
         messages.error(request, 'Only pending applications can be approved.')
         return redirect('hostel:all_applications')
     
-    # Count approved applications for this semester and room type
-    approved_single = HostelApplication.objects.filter(semester=semester, room_type='single', status='approved').count()
-    approved_double = HostelApplication.objects.filter(semester=semester, room_type='double', status='approved').count()
+    # Approved applications for this semester and room type (from the quota counters)
+    approved_counts = semester.get_approved_counts()
+    approved_single = approved_counts['single']
+    approved_double = approved_counts['double']
     quota_single = semester.quota_single
     quota_double = semester.quota_double * 2  # double room quota is number of students
     
@@ -901,28 +956,9 @@ def approve_application(request, application_id):
         messages.error(request, 'Quota for double rooms reached. Application auto-rejected.')
         return redirect('hostel:all_applications')
     
-    # Check for available room of requested type and period
-    from .models import Room
-    available_rooms = Room.objects.filter(
-        room_type=application.room_type,
-        status='available'
-    )
-    
-    # Count available rooms/spots for the requested period
-    available_spots = 0
-    for room in available_rooms:
-        if not room.is_full_for_period(application.start_date, application.end_date):
-            if application.room_type == 'single':
-                available_spots += 1
-            else:  # double room
-                # For double rooms, count available spots (could be 1 or 2 per room)
-                capacity = room.capacity
-                current_occupants = room.assignments.filter(
-                    status='active',
-                    start_date__lt=application.end_date,
-                    end_date__gt=application.start_date
-                ).count()
-                available_spots += (capacity - current_occupants)
+    # Count available spots of requested type for the requested period
+    free_capacity = free_capacity_by_room_type(application.start_date, application.end_date)
+    available_spots = free_capacity[application.room_type]
     
     # If no spots available, auto-reject
     if available_spots <= 0:
@@ -940,15 +976,8 @@ def approve_application(request, application_id):
     application.save()
     messages.success(request, 'Application approved successfully!')
     
-    # After approval, check if quota is now full and auto-reject remaining pending
-    if application.room_type == 'single' and approved_single + 1 >= quota_single:
-        HostelApplication.objects.filter(
-            semester=semester, room_type='single', status='pending'
-        ).update(status='rejected', rejection_reason='Quota reached', is_auto_rejected=True)
-    if application.room_type == 'double' and approved_double + 1 >= quota_double:
-        HostelApplication.objects.filter(
-            semester=semester, room_type='double', status='pending'
-        ).update(status='rejected', rejection_reason='Quota reached', is_auto_rejected=True)
+    # After approval, auto-reject pending applications that can no longer be approved
+    reconcile_auto_rejections([semester])
     
     return redirect('hostel:all_applications')
 
@@ -958,16 +987,8 @@ def update_room_statuses(request):
     """
     Manually update all room statuses based on current assignments
     """
-    from .models import Room
-    rooms = Room.objects.all()
-    updated_count = 0
-    
-    for room in rooms:
-        old_status = room.status
-        room.update_status()
-        if old_status != room.status:
-            updated_count += 1
-    
+    updated_count = Room.update_statuses()
+
     if updated_count > 0:
         messages.success(request, f'Successfully updated {updated_count} room statuses.')
     else:
@@ -979,25 +1000,14 @@ def update_room_statuses(request):
 @user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
 def manage_payments(request):
     """View for staff to manage student payments"""
-    status = request.GET.get('status')
-    semester_id = request.GET.get('semester')
+    filters = payment_filters(request.GET)
     
     # Get only payments for students with approved applications and assigned rooms
-    payments = Payment.objects.filter(
-        room_assignment__isnull=False,  # Has a room assignment
-        room_assignment__hostel_application__status='approved'  # Application is approved
-    ).select_related(
-        'student', 
-        'room_assignment__room',
-        'room_assignment__hostel_application__semester'
-    ).order_by('-payment_period_start')
+    # (the same ones as the payments export)
+    payments = listed_payments().order_by('-payment_period_start')
     
-    # Apply filters if provided
-    if status:
-        payments = payments.filter(status=status)
-    
-    if semester_id:
-        payments = payments.filter(room_assignment__hostel_application__semester_id=semester_id)
+    # Apply filters if provided (the same ones as the payments export)
+    payments = filter_payments(payments, filters)
     
     # Get all semesters for filter dropdown
     semesters = Semester.objects.all().order_by('-start_date')
@@ -1005,8 +1015,8 @@ def manage_payments(request):
     return render(request, 'hostel/staff/manage_payments.html', {
         'payments': payments,
         'semesters': semesters,
-        'status': status,
-        'semester': semester_id,
+        'status': filters['status'],
+        'semester': str(filters['semester'] or ''),
     })
 
 @login_required
@@ -1046,126 +1056,12 @@ def update_payment_status(request, payment_id):
 @user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
 def room_statistics(request):
     """View for staff to see room statistics and reports"""
-    # Get all rooms
-    all_rooms = Room.objects.all()
-    
-    # Count rooms by type
-    single_rooms = all_rooms.filter(room_type='single').count()
-    double_rooms = all_rooms.filter(room_type='double').count()
-    
-    # Calculate total capacity
-    total_single_capacity = single_rooms
-    total_double_capacity = double_rooms * 2  # Each double room can accommodate 2 students
-    
-    # Count current occupancy
-    active_assignments = RoomAssignment.objects.filter(status='active')
-    
-    # Get current date
-    today = timezone.now().date()
-    
-    # Count current occupancy (assignments that include today's date)
-    current_single_occupancy = active_assignments.filter(
-        room__room_type='single',
-        start_date__lte=today,
-        end_date__gte=today
-    ).count()
-    
-    current_double_occupancy = active_assignments.filter(
-        room__room_type='double',
-        start_date__lte=today,
-        end_date__gte=today
-    ).count()
-    
-    # Calculate available spots
-    available_single = total_single_capacity - current_single_occupancy
-    available_double = total_double_capacity - current_double_occupancy
-    
-    # Calculate occupancy rates
-    single_occupancy_rate = 0
-    if total_single_capacity > 0:
-        single_occupancy_rate = round((current_single_occupancy / total_single_capacity) * 100)
-    
-    double_occupancy_rate = 0
-    if total_double_capacity > 0:
-        double_occupancy_rate = round((current_double_occupancy / total_double_capacity) * 100)
-    
-    # Get room preference statistics from applications
-    all_applications = HostelApplication.objects.all()
-    single_applications = all_applications.filter(room_type='single').count()
-    double_applications = all_applications.filter(room_type='double').count()
-    
-    # Get active semester for quota information
-    active_semesters = Semester.objects.filter(is_active=True)
-    semester_data = []
-    
-    for semester in active_semesters:
-        # Count approved applications for this semester
-        approved_single = HostelApplication.objects.filter(
-            semester=semester, 
-            room_type='single', 
-            status='approved'
-        ).count()
-        
-        approved_double = HostelApplication.objects.filter(
-            semester=semester, 
-            room_type='double', 
-            status='approved'
-        ).count()
-        
-        # Calculate remaining quota
-        remaining_single_quota = max(0, semester.quota_single - approved_single)
-        remaining_double_quota = max(0, semester.quota_double * 2 - approved_double)
-        
-        semester_data.append({
-            'name': semester.name,
-            'quota_single': semester.quota_single,
-            'quota_double': semester.quota_double * 2,  # Convert to student capacity
-            'approved_single': approved_single,
-            'approved_double': approved_double,
-            'remaining_single_quota': remaining_single_quota,
-            'remaining_double_quota': remaining_double_quota
-        })
-    
-    # Calculate monthly statistics for the past year
-    one_year_ago = timezone.now() - datetime.timedelta(days=365)
-    monthly_applications = HostelApplication.objects.filter(
-        date_applied__gte=one_year_ago
-    ).extra(
-        select={'month': "EXTRACT(month FROM date_applied)"}
-    ).values('month', 'room_type').annotate(count=Count('id')).order_by('month')
-    
-    # Format data for charts
-    months = list(range(1, 13))
-    monthly_data = {
-        'single': [0] * 12,
-        'double': [0] * 12
-    }
-    
-    for item in monthly_applications:
-        month_index = int(item['month']) - 1  # Convert to 0-based index
-        room_type = item['room_type']
-        count = item['count']
-        monthly_data[room_type][month_index] = count
-    
-    # Ensure all values are at least 0 (not None) for the charts
-    context = {
-        'single_rooms': single_rooms or 0,
-        'double_rooms': double_rooms or 0,
-        'total_single_capacity': total_single_capacity or 0,
-        'total_double_capacity': total_double_capacity or 0,
-        'current_single_occupancy': current_single_occupancy or 0,
-        'current_double_occupancy': current_double_occupancy or 0,
-        'available_single': available_single or 0,
-        'available_double': available_double or 0,
-        'single_applications': single_applications or 0,
-        'double_applications': double_applications or 0,
-        'single_occupancy_rate': single_occupancy_rate,
-        'double_occupancy_rate': double_occupancy_rate,
-        'semester_data': semester_data,
-        'monthly_data': monthly_data,
-        'months': months
-    }
-    
+    # All the numbers come from one cached snapshot (see reports.py)
+    statistics = get_room_statistics()
+    context = dict(statistics)
+    single_rooms = statistics['single_rooms']
+    double_rooms = statistics['double_rooms']
+
     # Add dummy data if no rooms exist to ensure charts render
     if single_rooms == 0 and double_rooms == 0:
         context.update({
@@ -1180,3 +1076,55 @@ def room_statistics(request):
         })
     
     return render(request, 'hostel/staff/room_statistics.html', context)
+
+OCCUPANCY_SERIES_MAX_DAYS = 366 * 10
+
+@login_required
+@user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
+def occupancy_series(request):
+    """
+    JSON occupancy of single and double rooms over time, for charts.
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD&interval=day|week; by default the last
+    90 days and the next 90 days, per day.
+    """
+    today = timezone.now().date()
+    try:
+        start_date = datetime.date.fromisoformat(request.GET.get('start') or (today - datetime.timedelta(days=90)).isoformat())
+        end_date = datetime.date.fromisoformat(request.GET.get('end') or (today + datetime.timedelta(days=90)).isoformat())
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be dates in the format YYYY-MM-DD'}, status=400)
+    interval = request.GET.get('interval', 'day')
+
+    if interval not in ('day', 'week'):
+        return JsonResponse({'error': 'interval must be "day" or "week"'}, status=400)
+    if start_date > end_date:
+        return JsonResponse({'error': 'start must not be after end'}, status=400)
+    if (end_date - start_date).days >= OCCUPANCY_SERIES_MAX_DAYS:
+        return JsonResponse({'error': f'The range can be at most {OCCUPANCY_SERIES_MAX_DAYS} days'}, status=400)
+
+    series = get_occupancy_series(start_date, end_date, interval)
+    series.update({'start': start_date.isoformat(), 'end': end_date.isoformat(), 'interval': interval})
+    return JsonResponse(series)
+
+@login_required
+@user_passes_test(lambda u: u.user_type in ['staff', 'admin'])
+def export_data(request, name):
+    """
+    Download applications, assignments or payments (see exports.py) as
+    ?format=csv (default) or jsonl, gzipped with ?gzip=1, with the filters
+    of the matching staff page. The file is streamed while it is read.
+    """
+    if name not in EXPORTS:
+        raise Http404
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return JsonResponse({'error': f'format must be one of: {", ".join(FORMATS)}'}, status=400)
+    compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+
+    response = StreamingHttpResponse(
+        export_chunks(name, request.GET, fmt, compress),
+        content_type='application/gzip' if compress else f'{FORMATS[fmt]}; charset=utf-8',
+    )
+    filename = export_filename(name, fmt, compress, timezone.now().date())
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
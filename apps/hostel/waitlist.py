@@ -0,0 +1,72 @@
+from functools import partial
+from django.db import transaction
+from django.db.models import F, Q
+from .availability import invalidate_semester_availability
+from .models import HostelApplication, SemesterQuotaUsage
+from .reports import invalidate_room_statistics
+
+# Waitlist of auto-rejected applications
+# An application that is auto-rejected (no quota or room left) joins the
+# waitlist of its semester and room type. Its place is fixed by when it was
+# submitted: (date_applied, id), oldest first. When an approved or pending
+# application is rejected and frees its place in the quota, the first ones
+# on the waitlist go back to pending. The waitlist has its own partial index
+# in that order, so taking the next few or counting the places in front of
+# a student only reads the waitlist entries involved.
+#
+# A student who submits a new application leaves the waitlist with their
+# older ones, so a promotion never gives anyone a second active application.
+
+
+def waitlist(semester, room_type):
+    """The waitlisted applications of a semester and room type, first in line first"""
+    return HostelApplication.objects.filter(
+        semester=semester, room_type=room_type, waitlisted=True
+    ).order_by('date_applied', 'id')
+
+
+def waitlist_position(application):
+    """The application's place on its waitlist (1 is next), or None if it isn't on one"""
+    if not application.waitlisted:
+        return None
+    ahead = waitlist(application.semester_id, application.room_type).filter(
+        Q(date_applied__lt=application.date_applied) | Q(date_applied=application.date_applied, id__lt=application.id)
+    )
+    return ahead.count() + 1
+
+
+def promote_from_waitlist(semester, room_type):
+    """
+    Move the first applications on the waitlist back to pending, as many as
+    there are free places in the quota, with one UPDATE. Pending applications
+    hold a place like approved ones (see admit_application), so the free
+    places are read from the locked quota counter.
+    Returns the number of applications promoted.
+    """
+    # Make sure the counters exist before we try to lock them
+    SemesterQuotaUsage.get_for_semester(semester)
+    with transaction.atomic():
+        usage = SemesterQuotaUsage.objects.select_for_update().get(semester=semester, room_type=room_type)
+        free_places = semester.get_quota(room_type) - usage.approved - usage.pending
+        if free_places <= 0:
+            return 0
+        # waitlisted=True is checked again on the rows being updated, so two
+        # promotions running at once can't both promote the same application
+        promoted = HostelApplication.objects.filter(
+            waitlisted=True, id__in=waitlist(semester, room_type).values('id')[:free_places]
+        ).update(status='pending', is_auto_rejected=False, rejection_reason='', waitlisted=False)
+        if promoted:
+            SemesterQuotaUsage.objects.filter(pk=usage.pk).update(pending=F('pending') + promoted)
+            transaction.on_commit(invalidate_room_statistics)
+            transaction.on_commit(partial(invalidate_semester_availability, [semester.id]))
+    return promoted
+
+
+def leave_waitlist(application):
+    """
+    Take the student's other applications off the waitlist when they submit
+    this one (called by admit_application and queue_application)
+    """
+    return HostelApplication.objects.filter(
+        student_id=application.student_id, waitlisted=True
+    ).exclude(id=application.id).update(waitlisted=False)
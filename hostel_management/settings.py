@@ -138,6 +138,54 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 
+# Logging
+# Everything in the hostel app logs to the 'apps.hostel' logger. Production
+# can stay quiet (the default, WARNING) while staging sets HOSTEL_LOG_LEVEL=DEBUG
+# in .env to get the room and quota diagnostics.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '{asctime} {levelname} {name}: {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'apps.hostel': {
+            'handlers': ['console'],
+            'level': os.getenv('HOSTEL_LOG_LEVEL', 'WARNING').upper(),
+            'propagate': False,
+        },
+    },
+}
+
+# In development, log the number of SQL queries and their time for every
+# request (visible with HOSTEL_LOG_LEVEL=INFO)
+if DEBUG:
+    MIDDLEWARE.append('apps.hostel.middleware.QueryCountMiddleware')
+
+# Staff reports
+# The room statistics page is served from a cached snapshot that is dropped
+# whenever rooms, applications, assignments or semesters change. It also
+# expires after this many seconds, which bounds how stale it can get when
+# several server processes each have their own (default, in-memory) cache.
+ROOM_STATISTICS_CACHE_SECONDS = int(os.getenv('ROOM_STATISTICS_CACHE_SECONDS', '300'))
+# The free spots per semester shown on the apply and application pages are
+# cached the same way (see availability.py)
+SEMESTER_AVAILABILITY_CACHE_SECONDS = int(os.getenv('SEMESTER_AVAILABILITY_CACHE_SECONDS', '300'))
+
+# Hostel application intake
+# When True, new applications are only queued by the apply page and are
+# admitted or rejected in order by `python manage.py process_application_queue`
+HOSTEL_QUEUED_INTAKE = os.getenv('HOSTEL_QUEUED_INTAKE', 'False').lower() == 'true'
+
 AUTHENTICATION_BACKENDS = [
     'apps.accounts.backends.StudentIDAuthBackend',
     'django.contrib.auth.backends.ModelBackend',